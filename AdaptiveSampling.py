@@ -0,0 +1,178 @@
+import inspect
+import math
+import numpy as np
+import MarkovModel as MarkovCls
+import MarkovModelVectorized as VecCls
+import OnlineStatistics as OnlineStat
+import ParameterClasses as P
+import InputData as Data
+
+# adaptive cohort simulates patients in batches and stops as soon as the confidence interval of every
+# requested outcome is narrower than its tolerance (or the patient budget is used up), so easy scenarios are
+# not over-simulated and noisy ones are not under-simulated. Patients of batch n are simulated as the cohort with
+# id * ceil(max_pop_size / batch_size) + n, so two adaptive cohorts share the random numbers of each patient
+# (common random numbers) only if they have the same id, batch_size and max_pop_size (see check_paired).
+
+# outcomes whose precision can be targeted
+SURVIVAL_TIME = 'survival_time'
+COUNT_STROKES = 'count_strokes'
+COST = 'cost'
+UTILITY = 'utility'
+OUTCOMES = [SURVIVAL_TIME, COUNT_STROKES, COST, UTILITY]
+
+
+class AdaptiveCohort:
+    def __init__(self, id, therapy, tolerances, batch_size=1000, max_pop_size=100000, min_pop_size=None,
+                 alpha=None, streams=None, cohort_class=VecCls.Cohort):
+        """ create a cohort whose population size is determined during the simulation
+        :param id: an integer to specify the seed of the random number generators
+        :param therapy: selected therapy
+        :param tolerances: dictionary of the largest accepted half-length of the confidence interval of the
+                           mean of each outcome, for example {AdaptiveSampling.COST: 100}
+        :param batch_size: number of patients simulated in each batch
+                           (must be the same in cohorts compared with common random numbers)
+        :param max_pop_size: largest number of patients to simulate (patient budget; must be the same in cohorts
+                             compared with common random numbers)
+        :param min_pop_size: smallest number of patients to simulate before checking the tolerances
+                             (batch_size if not provided)
+        :param alpha: significance level of the confidence intervals (Data.ALPHA if not provided)
+        :param streams: RandomStreams.RandomStreams to draw the random numbers of patients from
+                        (the engine must accept a streams argument)
+        :param cohort_class: engine used to simulate each batch (MarkovModelVectorized.Cohort,
+                             MarkovModelEventDriven.Cohort or MarkovModelCompiled.Cohort)
+        """
+
+        for outcome in tolerances:
+            if outcome not in OUTCOMES:
+                raise ValueError('Unknown outcome {}; expected one of {}.'.format(outcome, OUTCOMES))
+        if streams is not None and 'streams' not in inspect.signature(cohort_class).parameters:
+            raise ValueError('{} does not support random streams.'.format(cohort_class.__qualname__))
+
+        self._id = id
+        self._therapy = therapy
+        self._tolerances = dict(tolerances)
+        self._batchSize = batch_size
+        self._maxPopSize = max_pop_size
+        self._minPopSize = batch_size if min_pop_size is None else min_pop_size
+        self._alpha = Data.ALPHA if alpha is None else alpha
+        self._streams = streams
+        self._cohortClass = cohort_class
+
+        # running statistics of each outcome (survival time of patients who have died only)
+        self._sumStats = {outcome: OnlineStat.OnlineSummaryStat(outcome, percentiles=[]) for outcome in OUTCOMES}
+        # outcomes of the simulated batches
+        self._batches = []
+        self._popSize = 0
+        self._ifConverged = False
+
+    def simulate(self):
+        """ simulates batches of patients until the tolerances are met or the patient budget is used up
+        :returns outputs from simulating this cohort
+        """
+
+        # batches are simulated as cohorts with distinct ids, so every patient has its own random numbers and
+        # cohorts with the same id, batch size and patient budget share them across therapies (common random numbers)
+        max_batches = self.get_max_n_batches()
+
+        while not self._ifConverged and self._popSize < self._maxPopSize:
+
+            # every batch is simulated with the full batch size (engines that seed patients with
+            # batch_id * pop_size + i would otherwise reuse the seeds of an earlier batch in a shorter last batch)
+            # and the last one is cut to the patient budget
+            batch_size = min(self._batchSize, self._maxPopSize - self._popSize)
+            batch_id = self._id * max_batches + len(self._batches)
+            if self._streams is None:
+                cohort = self._cohortClass(id=batch_id, therapy=self._therapy, pop_size=self._batchSize)
+            else:
+                cohort = self._cohortClass(id=batch_id, therapy=self._therapy, pop_size=self._batchSize,
+                                           streams=self._streams)
+            survival_times, count_strokes, costs, utilities = \
+                [np.array(outcome[:batch_size], dtype=float) for outcome in cohort.simulate_outcomes()]
+
+            # update the running statistics
+            self._sumStats[SURVIVAL_TIME].record_batch(survival_times[~np.isnan(survival_times)])
+            self._sumStats[COUNT_STROKES].record_batch(count_strokes)
+            self._sumStats[COST].record_batch(costs)
+            self._sumStats[UTILITY].record_batch(utilities)
+
+            self._batches.append((survival_times, count_strokes, costs, utilities))
+            self._popSize += batch_size
+
+            # check the precision of the estimates
+            if self._popSize >= self._minPopSize:
+                self._ifConverged = all(self.get_half_length(outcome) <= tolerance
+                                        for outcome, tolerance in self._tolerances.items())
+
+        return MarkovCls.CohortOutputs(self)
+
+    def get_half_length(self, outcome):
+        """ :returns the current half-length of the confidence interval of the mean of an outcome """
+        if self._sumStats[outcome].get_n() < 2:
+            return math.inf
+        return self._sumStats[outcome].get_t_half_length(self._alpha)
+
+    def get_half_lengths(self):
+        """ :returns dictionary of the current half-lengths of the confidence intervals of all outcomes """
+        return {outcome: self.get_half_length(outcome) for outcome in OUTCOMES}
+
+    def get_sumStat(self, outcome):
+        return self._sumStats[outcome]
+
+    def get_if_converged(self):
+        """ :returns True if all tolerances were met (False if the simulation stopped at the patient budget) """
+        return self._ifConverged
+
+    def get_n_batches(self):
+        return len(self._batches)
+
+    def get_max_n_batches(self):
+        """ :returns the number of batches that the patient budget allows """
+        return math.ceil(self._maxPopSize / self._batchSize)
+
+    def get_batch_ids(self):
+        """ :returns the cohort id of each batch that the patient budget allows """
+        max_batches = self.get_max_n_batches()
+        return [self._id * max_batches + n for n in range(max_batches)]
+
+    def get_batch_size(self):
+        return self._batchSize
+
+    def get_id(self):
+        return self._id
+
+    def get_parameters(self):
+        """ :returns the parameter object of the batches """
+        return P.ParametersFixed(self._therapy)
+
+    def get_streams(self):
+        return self._streams
+
+    def get_initial_pop_size(self):
+        """ :returns the number of patients simulated """
+        return self._popSize
+
+    def get_outcomes(self):
+        """ :returns (survival times (nan for patients who are alive), number of strokes, discounted costs,
+        discounted utilities) of the simulated patients """
+        if len(self._batches) == 0:
+            return tuple(np.zeros(0) for outcome in OUTCOMES)
+        return tuple(np.concatenate(outcome) for outcome in zip(*self._batches))
+
+
+def check_paired(cohort_1, cohort_2):
+    """ raises ValueError unless patient i of both adaptive cohorts is simulated with the same random numbers,
+    so that their outcomes can be compared patient by patient (common random numbers)
+    :param cohort_1: an AdaptiveCohort
+    :param cohort_2: an AdaptiveCohort (usually of the other therapy)
+    """
+    if cohort_1.get_batch_size() != cohort_2.get_batch_size() \
+            or cohort_1.get_batch_ids() != cohort_2.get_batch_ids():
+        raise ValueError('Adaptive cohorts share random numbers only if they have the same id, batch_size '
+                         'and max_pop_size.')
+    if cohort_1.get_initial_pop_size() != cohort_2.get_initial_pop_size():
+        raise ValueError('Adaptive cohorts can only be paired if they simulated the same number of patients '
+                         '({} and {}).'.format(cohort_1.get_initial_pop_size(), cohort_2.get_initial_pop_size()))
+    streams_1, streams_2 = cohort_1.get_streams(), cohort_2.get_streams()
+    if (streams_1 is None) != (streams_2 is None) \
+            or (streams_1 is not None and streams_1.get_seed() != streams_2.get_seed()):
+        raise ValueError('Adaptive cohorts share random numbers only if they use the same random streams.')
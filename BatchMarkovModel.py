@@ -0,0 +1,41 @@
+import MarkovModel as MarkovCls
+import ResultCache as Cache
+import InputData as Data
+
+# runs a batch of cohorts (therapy, cohort id, population size) and returns their outputs keyed by these specs;
+# cohorts with the same id and population size share the random numbers of each patient across therapies
+# (common random numbers), duplicated specs are simulated once, and results can be reused from an on-disk cache
+
+
+def simulate_cohorts(specs, cache_dir=None, n_workers=None, streams=None):
+    """ simulates a batch of cohorts
+    :param specs: list of (therapy, cohort id, population size) tuples (population size can be None
+                  for Data.POP_SIZE)
+    :param cache_dir: directory of the on-disk cache of cohort outcomes (no caching if not provided)
+    :param n_workers: number of worker processes used to simulate each cohort
+    :param streams: RandomStreams.RandomStreams to draw the random numbers of patients from
+                    (by default each patient seeds its own generator with its id)
+    :returns dictionary of cohort outputs keyed by (therapy, cohort id, population size)
+    """
+
+    cache = None if cache_dir is None else Cache.DiskCache(cache_dir, max_bytes=Data.CACHE_MAX_BYTES)
+    results = {}
+
+    for therapy, cohort_id, pop_size in specs:
+        if pop_size is None:
+            pop_size = Data.POP_SIZE
+        spec = (therapy, cohort_id, pop_size)
+        # each distinct cohort is simulated only once
+        if spec in results:
+            continue
+
+        # reuse the outcomes of a previous run if available
+        cohort = MarkovCls.Cohort(id=cohort_id, therapy=therapy, pop_size=pop_size, streams=streams)
+        results[spec] = cohort.simulate(n_workers=n_workers, cache=cache)
+
+    # also return the outputs under the specs as they were given
+    for therapy, cohort_id, pop_size in specs:
+        if pop_size is None:
+            results[(therapy, cohort_id, None)] = results[(therapy, cohort_id, Data.POP_SIZE)]
+
+    return results
@@ -0,0 +1,83 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import BenchmarkMarkovModel as Bench
+
+# import-time benchmark: measures how long a fresh Python process takes to import each model module (the cold
+# start cost paid by every spawned worker process) and which heavy dependencies the import pulls in, and saves
+# the results as JSON so that startup regressions can be caught across commits
+
+# modules of the simulation core (needed by workers that only simulate) and of the reporting layer
+CORE_MODULES = ['ParameterClasses', 'MarkovModel', 'MarkovModelVectorized', 'MarkovModelEventDriven',
+                'MarkovModelCompiled', 'BatchMarkovModel', 'ScenarioAnalysis']
+REPORT_MODULES = ['SupportMarkovModel', 'ReportFigures', 'ProbabilisticSensitivity']
+
+# heavy dependencies that the simulation core should not import
+HEAVY_DEPENDENCIES = ['scipy.stats', 'scipy.linalg', 'matplotlib', 'numba',
+                      'scr.StatisticalClasses', 'scr.SamplePathClasses', 'scr.FigureSupport', 'scr.EconEvalClasses']
+
+# code run in the fresh process: the time of importing the module (after the interpreter has started)
+# and the heavy dependencies that were imported
+_CASE = '''
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{'seconds': elapsed, 'heavy': [m for m in {heavy!r} if m in sys.modules]}}))
+'''
+
+
+def time_import(module, repeats=5):
+    """ imports a module in fresh processes
+    :param module: name of the module
+    :param repeats: number of processes (the median time is reported)
+    :returns dictionary of import times (seconds) and the heavy dependencies that were imported
+    """
+
+    env = dict(os.environ, MPLBACKEND='Agg')
+    times = []
+    heavy = []
+    for i in range(repeats):
+        completed = subprocess.run(
+            [sys.executable, '-c', _CASE.format(module=module, heavy=HEAVY_DEPENDENCIES)],
+            env=env, cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True, check=True)
+        result = json.loads(completed.stdout.strip().splitlines()[-1])
+        times.append(result['seconds'])
+        heavy = result['heavy']
+
+    return {
+        'module': module,
+        'median_seconds': statistics.median(times),
+        'min_seconds': min(times),
+        'heavy_dependencies': heavy
+    }
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Import-time benchmark of the model modules.')
+    parser.add_argument('--modules', nargs='+', default=CORE_MODULES + REPORT_MODULES)
+    parser.add_argument('--repeats', type=int, default=5, help='number of fresh processes per module')
+    parser.add_argument('--output', default='benchmark_imports.json', help='JSON file to save the results to')
+    args = parser.parse_args()
+
+    results = []
+    for module in args.modules:
+        result = time_import(module, args.repeats)
+        results.append(result)
+        print('{:>26} median={:7.3f}s min={:7.3f}s  heavy: {}'.format(
+            module, result['median_seconds'], result['min_seconds'],
+            ', '.join(result['heavy_dependencies']) or '-'))
+
+    with open(args.output, 'w') as file:
+        json.dump({
+            'commit': Bench.get_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'results': results
+        }, file, indent=2)
+    print('Results saved to', args.output)
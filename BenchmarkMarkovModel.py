@@ -0,0 +1,189 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+
+# headless benchmark suite of the Markov model: times cohort construction, simulation, output extraction and
+# reporting for several population sizes, time steps and engines, and saves the results as JSON so that
+# regressions can be caught across commits. Every case runs in a fresh process so that module settings and
+# peak memory of one case do not affect the others.
+
+POP_SIZES = [10**3, 10**4, 10**5, 10**6]
+DELTA_TS = [1, 1/12]
+ENGINES = ['object', 'vectorized', 'event', 'compiled']
+
+
+def run_case(engine, pop_size, delta_t):
+    """ runs one benchmark case in this process
+    :param engine: 'object' (MarkovModel.Cohort), 'vectorized' (MarkovModelVectorized.Cohort)
+                   'event' (MarkovModelEventDriven.Cohort) or 'compiled' (MarkovModelCompiled.Cohort)
+    :param pop_size: cohort population size
+    :param delta_t: length of time step
+    :returns dictionary of timings (seconds), throughput and peak memory
+    """
+
+    import numpy as np
+    import InputData as Data
+    # time step is a module setting read when parameters are created
+    Data.DELTA_T = delta_t
+
+    import ParameterClasses as P
+    import MarkovModel as MarkovCls
+    import MarkovModelVectorized as VecCls
+    import MarkovModelEventDriven as EventCls
+    import MarkovModelCompiled as CompiledCls
+    import SupportMarkovModel as SupportMarkov
+
+    timings = {}
+    outputs = {}
+    param = P.ParametersFixed(P.Therapies.NONE)
+
+    if engine == 'compiled':
+        # the kernel is compiled (or loaded from Numba's cache) on its first call, which is timed separately
+        start = time.perf_counter()
+        CompiledCls.Cohort(id=0, therapy=P.Therapies.NONE, pop_size=1).simulate_outcomes()
+        timings['jit_compile'] = time.perf_counter() - start
+    for therapy in P.Therapies:
+
+        start = time.perf_counter()
+        if engine == 'object':
+            cohort = MarkovCls.Cohort(id=0, therapy=therapy, pop_size=pop_size)
+        elif engine == 'vectorized':
+            cohort = VecCls.Cohort(id=0, therapy=therapy, pop_size=pop_size)
+        elif engine == 'event':
+            cohort = EventCls.Cohort(id=0, therapy=therapy, pop_size=pop_size)
+        else:
+            cohort = CompiledCls.Cohort(id=0, therapy=therapy, pop_size=pop_size)
+        time_init = time.perf_counter() - start
+
+        # patients of the object engine are created by Cohort.simulate (after the cache lookup), so their
+        # construction is timed as a phase of its own
+        if engine == 'object':
+            start = time.perf_counter()
+            cohort.populate()
+            time_patient_init = time.perf_counter() - start
+
+        start = time.perf_counter()
+        if engine == 'object':
+            # Cohort.simulate also builds the outputs; their construction time is measured below and subtracted
+            cohort.simulate()
+        else:
+            cohort.simulate_outcomes()
+        time_simulate = time.perf_counter() - start
+
+        start = time.perf_counter()
+        outputs[therapy] = MarkovCls.CohortOutputs(cohort)
+        time_outputs = time.perf_counter() - start
+        if engine == 'object':
+            time_simulate -= time_outputs
+
+        # the first therapy is reported
+        if therapy == P.Therapies.NONE:
+            timings['cohort_init'] = time_init
+            if engine == 'object':
+                timings['patient_init'] = time_patient_init
+            timings['cohort_simulate'] = time_simulate
+            timings['cohort_outputs'] = time_outputs
+
+    # number of patient time steps simulated under the first therapy (patients who die at time step k
+    # were simulated for k+1 time steps)
+    survival_times = outputs[P.Therapies.NONE].get_survival_times_by_patient()
+    if_alive = np.isnan(survival_times)
+    patient_cycles = np.sum(np.round(survival_times[~if_alive] / delta_t + 0.5)) \
+        + np.sum(if_alive) * np.ceil(Data.SIM_LENGTH / delta_t)
+
+    # reporting (printed text and figures are discarded)
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        SupportMarkov.print_outcomes(outputs[P.Therapies.NONE], 'No Therapy:')
+        timings['print_outcomes'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        SupportMarkov.report_CEA_CBA(outputs[P.Therapies.NONE], outputs[P.Therapies.ANTICOAG])
+        timings['report_CEA_CBA'] = time.perf_counter() - start
+
+    return {
+        'engine': engine,
+        'compiled': CompiledCls.if_compiled(),
+        'pop_size': pop_size,
+        'delta_t': delta_t,
+        # the stroke state is expanded into tunnel states when delta_t is shorter than TRANS_MATRIX_TIME_STEP,
+        # so results are only comparable across commits with the same number of model states
+        'n_model_states': len(param.get_model_states()),
+        'timings': timings,
+        'patient_cycles': int(patient_cycles),
+        'patient_cycles_per_second': patient_cycles / timings['cohort_simulate'],
+        # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (2**20 if sys.platform == 'darwin' else 2**10)
+    }
+
+
+def run_case_in_subprocess(engine, pop_size, delta_t):
+    """ runs one benchmark case in a fresh process with a non-interactive matplotlib backend """
+
+    env = dict(os.environ, MPLBACKEND='Agg')
+    completed = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--case', engine, str(pop_size), repr(delta_t)],
+        env=env, cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True, check=True)
+    # the result is the last line printed by the case
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def get_commit():
+    """ :returns the current git commit (None if not available) """
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Benchmarks of the Markov model.')
+    parser.add_argument('--pop-sizes', type=int, nargs='+', default=POP_SIZES)
+    parser.add_argument('--delta-ts', type=float, nargs='+', default=DELTA_TS)
+    parser.add_argument('--engines', nargs='+', choices=ENGINES, default=ENGINES)
+    parser.add_argument('--max-object-pop-size', type=int, default=10**5,
+                        help='largest population size simulated with the object (per-patient) engine')
+    parser.add_argument('--output', default='benchmark_results.json', help='JSON file to save the results to')
+    parser.add_argument('--case', nargs=3, metavar=('ENGINE', 'POP_SIZE', 'DELTA_T'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.case is not None:
+        # run a single case (called by run_case_in_subprocess)
+        print(json.dumps(run_case(args.case[0], int(args.case[1]), float(args.case[2]))))
+        sys.exit()
+
+    results = []
+    for engine in args.engines:
+        for pop_size in args.pop_sizes:
+            if engine == 'object' and pop_size > args.max_object_pop_size:
+                continue
+            for delta_t in args.delta_ts:
+                result = run_case_in_subprocess(engine, pop_size, delta_t)
+                results.append(result)
+                print('{:>10} pop={:<8} dt={:<8.4g} init={:8.3f}s patients={:8.3f}s simulate={:8.3f}s '
+                      'outputs={:8.3f}s print={:6.3f}s CEA={:6.3f}s  {:12.0f} patient-cycles/s  '
+                      'peak RSS={:7.1f} MB'.format(
+                        engine, pop_size, delta_t,
+                        result['timings']['cohort_init'], result['timings'].get('patient_init', 0),
+                        result['timings']['cohort_simulate'],
+                        result['timings']['cohort_outputs'], result['timings']['print_outcomes'],
+                        result['timings']['report_CEA_CBA'], result['patient_cycles_per_second'],
+                        result['peak_rss_mb']))
+
+    with open(args.output, 'w') as file:
+        json.dump({
+            'commit': get_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'results': results
+        }, file, indent=2)
+    print('Results saved to', args.output)
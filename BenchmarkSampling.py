@@ -0,0 +1,36 @@
+import timeit
+import scr.RandomVariantGenerators as rndClasses
+import ParameterClasses as P
+
+# microbenchmark of the per-time-step cost of sampling the next health state:
+# before: a new Empirical distribution is built from the transition probabilities at every step
+# after: the sampler precomputed by ParametersFixed is reused
+
+N_DRAWS = 100000
+
+param = P.ParametersFixed(P.Therapies.ANTICOAG)
+state = P.HealthStats.POST_STROKE
+
+
+def sample_by_building_empirical(rng):
+    return rndClasses.Empirical(param.get_transition_prob(state)).sample(rng)
+
+
+def sample_by_precomputed_sampler(rng):
+    return param.get_transition_sampler(state).sample(rng)
+
+
+# both methods must draw the same states from the same random number stream
+rng_before = rndClasses.RNG(0)
+rng_after = rndClasses.RNG(0)
+for i in range(1000):
+    assert sample_by_building_empirical(rng_before) == sample_by_precomputed_sampler(rng_after)
+
+rng = rndClasses.RNG(1)
+time_before = min(timeit.repeat(lambda: sample_by_building_empirical(rng), number=N_DRAWS, repeat=3))
+time_after = min(timeit.repeat(lambda: sample_by_precomputed_sampler(rng), number=N_DRAWS, repeat=3))
+
+print("Per-step sampling cost over {} draws:".format(N_DRAWS))
+print("  Empirical built per step:   {:.3f} microseconds".format(1e6 * time_before / N_DRAWS))
+print("  Precomputed sampler:        {:.3f} microseconds".format(1e6 * time_after / N_DRAWS))
+print("  Speedup:                    {:.1f}x".format(time_before / time_after))
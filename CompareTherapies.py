@@ -1,23 +1,15 @@
 import ParameterClasses as P
-import MarkovModel as MarkovCls
+import BatchMarkovModel as Batch
 import SupportMarkovModel as SupportMarkov
+import InputData as Data
 
 
-# simulating no therapy
-# create a cohort
-cohort_none = MarkovCls.Cohort(
-    id=0,
-    therapy=P.Therapies.NONE)
-# simulate the cohort
-simOutputs_none = cohort_none.simulate()
-
-# simulating anticoagulation therapy
-# create a cohort
-cohort_anticoag = MarkovCls.Cohort(
-    id=0,
-    therapy=P.Therapies.ANTICOAG)
-# simulate the cohort
-simOutputs_anticoag = cohort_anticoag.simulate()
+# simulate the cohorts (or reuse them from the cache if an earlier script already simulated them)
+simOutputs = Batch.simulate_cohorts(
+    specs=[(P.Therapies.NONE, 0, None), (P.Therapies.ANTICOAG, 0, None)],
+    cache_dir=Data.CACHE_DIR)
+simOutputs_none = simOutputs[(P.Therapies.NONE, 0, None)]
+simOutputs_anticoag = simOutputs[(P.Therapies.ANTICOAG, 0, None)]
 
 # draw survival curves and histograms
 SupportMarkov.draw_survival_curves_and_histograms(simOutputs_none, simOutputs_anticoag)
@@ -26,9 +18,9 @@ SupportMarkov.draw_survival_curves_and_histograms(simOutputs_none, simOutputs_an
 SupportMarkov.print_outcomes(simOutputs_none, "No Therapy:")
 SupportMarkov.print_outcomes(simOutputs_anticoag, "Anticoagulation Therapy:")
 
-# print comparative outcomes
-SupportMarkov.print_comparative_outcomes(simOutputs_none, simOutputs_anticoag)
+# print comparative outcomes (both cohorts have id 0, so patients are paired by common random numbers)
+SupportMarkov.print_comparative_outcomes(simOutputs_none, simOutputs_anticoag, if_paired=True)
 
 # report the CEA results
-SupportMarkov.report_CEA_CBA(simOutputs_none, simOutputs_anticoag)
+SupportMarkov.report_CEA_CBA(simOutputs_none, simOutputs_anticoag, if_paired=True)
 
@@ -4,8 +4,11 @@ SIM_LENGTH = 50   # length of simulation (years)
 ALPHA = 0.05        # significance level for calculating confidence intervals
 DISCOUNT = 0.03     # annual discount rate
 DELTA_T = 1         # years (length of time step, how frequently you look at the patient)
+CACHE_DIR = 'cohort_cache'  # directory where simulated cohort outcomes are cached for reuse across scripts
+CACHE_MAX_BYTES = 100 * 2**20  # maximum size of the cache (least recently used entries are evicted)
 
 # transition matrix
+TRANS_MATRIX_TIME_STEP = 1  # years (time step over which the probabilities of TRANS_MATRIX are defined)
 TRANS_MATRIX = [
     [0.75,  0.15,   0.0,    0.1],   # Well
     [0,     0.0,    1.0,    0.0],   # Stroke
@@ -13,6 +16,23 @@ TRANS_MATRIX = [
     [0.0,   0.0,    0.0,    1.0],   # Dead
     ]
 
+# age-dependent background mortality (not used unless AGE_DEPENDENT_MORTALITY is True)
+AGE_DEPENDENT_MORTALITY = False
+INITIAL_AGE = 65    # age of patients at the start of the simulation (years)
+# annual probability of death from other causes starting at each age (added to the probability of death
+# of every alive health state as a competing risk)
+BACKGROUND_MORTALITY = [
+    [0,     0.0],
+    [65,    0.015],
+    [70,    0.023],
+    [75,    0.037],
+    [80,    0.060],
+    [85,    0.100],
+    [90,    0.165],
+    [95,    0.260],
+    [100,   0.370],
+    ]
+
 # annual cost of each health state
 ANNUAL_STATE_COST = [
     0.0,      # Well
@@ -36,3 +56,14 @@ ANTICOAGULANT_COST = 2000
 RR_STROKE = 0.65
 # anticoagulation relative risk in increasing mortality due to bleeding is 1.05.
 RR_BLEEDING = 1.05
+
+# probabilistic sensitivity analysis
+# effective sample size behind the transition probabilities (concentration of Dirichlet distributions)
+TRANS_MATRIX_SAMPLE_SIZE = 100
+# 95% confidence intervals of the relative risks (log-normal distributions)
+RR_STROKE_CI = [0.5, 0.85]
+RR_BLEEDING_CI = [1.0, 1.1]
+# coefficient of variation of annual state costs (gamma distributions)
+ANNUAL_STATE_COST_CV = 0.2
+# standard deviation of annual state utilities (beta distributions)
+ANNUAL_STATE_UTILITY_SD = 0.02
@@ -0,0 +1,94 @@
+import cProfile
+import pstats
+import time
+
+# opt-in instrumentation of the simulation loop: the engines only call the profiler when one is passed to
+# simulate(), so the simulation runs at full speed when it is disabled
+
+PHASES = ['rng_init', 'sampling', 'state_update', 'cost_accrual', 'outputs']
+
+
+class SimulationProfiler:
+    def __init__(self, cprofile_path=None):
+        """ collects per-phase timers and counters of a cohort simulation
+        :param cprofile_path: if provided, the simulation also runs under cProfile and the statistics
+                              are dumped to this file (can be loaded with pstats)
+        """
+        self._phaseTimes = dict.fromkeys(PHASES, 0.0)
+        self._patientCycles = 0     # number of patient time steps simulated
+        self._draws = 0             # number of random numbers drawn
+        self._aliveCounts = []      # number of patients alive at the start of each time step
+        self._wallTime = 0.0
+        self._startTime = None
+
+        self._cprofilePath = cprofile_path
+        self._cprofile = None
+
+    def start(self):
+        """ starts timing a simulation (and cProfile if requested) """
+        if self._cprofilePath is not None:
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+        self._startTime = time.perf_counter()
+
+    def stop(self):
+        """ stops timing a simulation (and dumps the cProfile statistics if requested) """
+        self._wallTime += time.perf_counter() - self._startTime
+        if self._cprofile is not None:
+            self._cprofile.disable()
+            self._cprofile.dump_stats(self._cprofilePath)
+
+    def add_time(self, phase, seconds):
+        """ adds the time spent in a phase of the simulation """
+        self._phaseTimes[phase] += seconds
+
+    def record_cycle(self, k, n_alive=1):
+        """ records that n_alive patients were simulated over time step k """
+        while len(self._aliveCounts) <= k:
+            self._aliveCounts.append(0)
+        self._aliveCounts[k] += n_alive
+        self._patientCycles += n_alive
+
+    def record_draws(self, n):
+        """ records that n random numbers were drawn """
+        self._draws += n
+
+    def get_phase_times(self):
+        return dict(self._phaseTimes)
+
+    def get_patient_cycles(self):
+        return self._patientCycles
+
+    def get_draws(self):
+        return self._draws
+
+    def get_alive_counts(self):
+        return list(self._aliveCounts)
+
+    def get_pstats(self):
+        """ :returns the cProfile statistics (None if cProfile was not requested) """
+        if self._cprofile is None:
+            return None
+        return pstats.Stats(self._cprofile)
+
+    def get_report(self):
+        """ :returns a dictionary with the timers and counters """
+        return {
+            'wall_time': self._wallTime,
+            'phase_times': self.get_phase_times(),
+            'patient_cycles': self._patientCycles,
+            'draws': self._draws,
+            'alive_counts': self.get_alive_counts(),
+            'patient_cycles_per_second': self._patientCycles / self._wallTime if self._wallTime > 0 else None
+        }
+
+    def print_report(self):
+        """ prints the timers and counters """
+        print("Simulation profile:")
+        print("  Wall time: {:.3f} s".format(self._wallTime))
+        for phase in PHASES:
+            share = self._phaseTimes[phase] / self._wallTime if self._wallTime > 0 else 0
+            print("  {:<14}{:10.3f} s ({:.0%})".format(phase, self._phaseTimes[phase], share))
+        print("  Patient-cycles: {}".format(self._patientCycles))
+        print("  Random draws: {}".format(self._draws))
+        print("  Patients alive at each time step:", self._aliveCounts)
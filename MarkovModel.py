@@ -1,56 +1,106 @@
-import scr.SamplePathClasses as PathCls
-import scr.StatisticalClasses as StatCls
+import collections
+import concurrent.futures as futures
+import time
+import numpy as np
 import scr.RandomVariantGenerators as rndClasses
-import scr.EconEvalClasses as EconCls
 import ParameterClasses as P
 import InputData as Data
+import OnlineStatistics as OnlineStat
+import SurvivalCurve as Survival
+import ResultCache as Cache
 
 # patient class simulates patient, patient monitor follows patient, cohort simulates a cohort,
 # cohort outcome extracts info from simulation and returns it back
+# (the statistics of the support library are imported when cohort outputs are built, so worker processes
+# that only simulate patients do not import them)
 
 
 class Patient:  # when you store in self then all the things in that class have access to it
-    def __init__(self, id, parameters):
+    # fixed attributes (no per-instance __dict__) to keep patients compact in large cohorts
+    __slots__ = ('_id', '_param', '_stateMonitor', '_delta_t', '_rng')
+
+    def __init__(self, id, parameters, rng=None, recorder=None):
         """ initiates a patient
         :param id: ID of the patient
-        :param parameters: parameter object
+        :param parameters: parameter object (can be shared by all patients of a cohort)
+        :param rng: random number generator of this patient, for example a counter-based stream from
+                    RandomStreams (by default a generator seeded with the patient id is created when simulated)
+        :param recorder: TrajectoryRecorder.TrajectoryRecorder to record the path of this patient in
+                         (None to not record it)
         """
 
         self._id = id
-        # random number generator
-        self._rng = None
+        self._rng = rng
         # parameters
         self._param = parameters
         # state monitor
-        self._stateMonitor = PatientStateMonitor(parameters)
+        self._stateMonitor = PatientStateMonitor(parameters, recorder)
         # simulate time step
         self._delta_t = parameters.get_delta_t() # length of time step!
 
-    def simulate(self, sim_length):
-        """ simulate the patient over the specified simulation length """
+    def simulate(self, sim_length, profiler=None):
+        """ simulate the patient over the specified simulation length
+        :param sim_length: simulation length
+        :param profiler: Instrumentation.SimulationProfiler to collect timers and counters (None to disable)
+        """
 
-        # random number generator for this patient
-        self._rng = rndClasses.RNG(self._id)  # from now on use random number generator from support library
+        if profiler is not None:
+            self._simulate_profiled(sim_length, profiler)
+            return
+
+        # random number generator for this patient (not kept after the simulation to save memory)
+        if self._rng is None:
+            rng = rndClasses.RNG(self._id)  # from now on use random number generator from support library
+        else:
+            rng = self._rng
+
+        self._stateMonitor.start_recording(self._id)
 
         k = 0  # current time step
 
         # while the patient is alive and simulation length is not yet reached
         while self._stateMonitor.get_if_alive() and k*self._delta_t < sim_length:
 
-            # find transition probabilities of future state
-            trans_prob = self._param.get_transition_prob(self._stateMonitor.get_current_state())
-            # create an empirical distribution
-            empirical_dist = rndClasses.Empirical(trans_prob)
+            # find the (precomputed) distribution of future state
+            empirical_dist = self._param.get_transition_sampler(self._stateMonitor.get_current_state(), k)
             # sample from the empirical distribution to get a new state
             # (return an intger from {0, 1, 2, ...})
-            new_state_index = empirical_dist.sample(self._rng) # pass RNG
+            new_state_index = empirical_dist.sample(rng) # pass RNG
 
             # update health state
-            self._stateMonitor.update(k, P.HealthStats(new_state_index))
+            self._stateMonitor.update(k, self._param.get_model_state(new_state_index))
 
             # increment time step
             k += 1
 
+    def _simulate_profiled(self, sim_length, profiler):
+        """ same as simulate but records the time spent in each phase with the profiler """
+
+        start = time.perf_counter()
+        rng = rndClasses.RNG(self._id) if self._rng is None else self._rng
+        profiler.add_time('rng_init', time.perf_counter() - start)
+
+        self._stateMonitor.start_recording(self._id)
+
+        k = 0  # current time step
+
+        while self._stateMonitor.get_if_alive() and k*self._delta_t < sim_length:
+            profiler.record_cycle(k)
+
+            # sample the new state
+            start = time.perf_counter()
+            empirical_dist = self._param.get_transition_sampler(self._stateMonitor.get_current_state(), k)
+            new_state_index = empirical_dist.sample(rng)
+            profiler.add_time('sampling', time.perf_counter() - start)
+            profiler.record_draws(1)
+
+            # update health state (the monitor moves the time of cost accrual to its own phase)
+            start = time.perf_counter()
+            self._stateMonitor.update(k, self._param.get_model_state(new_state_index), profiler)
+            profiler.add_time('state_update', time.perf_counter() - start)
+
+            k += 1
+
     def get_survival_time(self):
         """ returns the patient's survival time"""
         return self._stateMonitor.get_survival_time()
@@ -69,24 +119,36 @@ class Patient:  # when you store in self then all the things in that class have
 
 class PatientStateMonitor:
     """ to update patient outcomes (years survived, cost, etc.) throughout the simulation """
-    def __init__(self, parameters):
+    __slots__ = ('_currentState', '_delta_t', '_survivalTime', '_strokecount', '_costUtilityOutcomes', '_recorder')
+
+    def __init__(self, parameters, recorder=None):
         """
         :param parameters: patient parameters
+        :param recorder: TrajectoryRecorder.TrajectoryRecorder to record the health state of every time step in
+                         (None to not record the path)
         """
         # current health state
         self._currentState = parameters.get_initial_health_state() # current health state
         self._delta_t = parameters.get_delta_t() #simulation time step
         self._survivalTime = 0 # survival time
-        self._ifDevelopedStroke = False #if the patient had developed a stroke
         self._strokecount = 0 #number of strokes
 
         #monitoring cost and utility ourcomes
         self._costUtilityOutcomes = PatientCostUtilityMonitor(parameters)
 
-    def update(self, k, next_state):
+        # trajectory recorder
+        self._recorder = recorder
+
+    def start_recording(self, patient_id):
+        """ starts the path of the patient in the trajectory recorder (if any) at its current state """
+        if self._recorder is not None:
+            self._recorder.start_patient(patient_id, self._currentState)
+
+    def update(self, k, next_state, profiler=None):
         """
         :param k: current time step
         :param next_state: next state
+        :param profiler: Instrumentation.SimulationProfiler to time the cost accrual (None to disable)
         """
 
         # updates state of patient
@@ -100,14 +162,24 @@ class PatientStateMonitor:
             # step, the 0.5 is a half cycle correction
 
         if self._currentState == P.HealthStats.STROKE:
-            self._ifDevelopedStroke = True
             self._strokecount += 1
 
         #collect cost and utility outcomes
-        self._costUtilityOutcomes.update(k, self._currentState, next_state)
+        if profiler is None:
+            self._costUtilityOutcomes.update(k, self._currentState, next_state)
+        else:
+            start = time.perf_counter()
+            self._costUtilityOutcomes.update(k, self._currentState, next_state)
+            elapsed = time.perf_counter() - start
+            profiler.add_time('cost_accrual', elapsed)
+            profiler.add_time('state_update', -elapsed)
 
         self._currentState = next_state
 
+        # record the new state in the path of the patient
+        if self._recorder is not None:
+            self._recorder.record(next_state)
+
     def get_if_alive(self):
         result = True
         if self._currentState == P.HealthStats.DEATH:
@@ -137,6 +209,7 @@ class PatientStateMonitor:
         return self._costUtilityOutcomes.get_total_discounted_utility()
 
 class PatientCostUtilityMonitor:
+    __slots__ = ('_param', '_totalDiscountedCost', '_totalDiscountedUtility')
 
     def __init__(self, parameters):
 
@@ -154,37 +227,10 @@ class PatientCostUtilityMonitor:
         :param next_state: next health state
         """
 
-        # update cost
-        cost = 0.5 * (self._param.get_annual_state_cost(current_state) +
-                      self._param.get_annual_state_cost(next_state)) * self._param.get_delta_t()
-        # update utility
-        utility = 0.5 * (self._param.get_annual_state_utility(current_state) +
-                         self._param.get_annual_state_utility(next_state)) * self._param.get_delta_t()
-
-        # add the cost of treatment
-        # if death will occur
-        if next_state == P.HealthStats.DEATH:
-            cost += 0.5 * self._param.get_annual_treatment_cost() * self._param.get_delta_t()
-        elif current_state == P.HealthStats.STROKE:
-            cost += 0
-        elif current_state == P.HealthStats.WELL:
-            cost += 0
-        else:
-            cost += 1 * self._param.get_annual_treatment_cost() * self._param.get_delta_t()
-
-
-        #if next_state == P.HealthStats.DEATH:
-            #cost +=0.5*self._param.get_delta_t()
-
-        #else:
-            #cost +=1*self._param.get_annual_treatment_cost()*self._param.get_delta_t
-
-
         # update total discounted cost and utility (corrected for the half-cycle effect)
-        self._totalDiscountedCost += \
-            EconCls.pv(cost, self._param.get_adj_discount_rate() / 2, 2*k + 1)
-        self._totalDiscountedUtility += \
-            EconCls.pv(utility, self._param.get_adj_discount_rate() / 2, 2*k + 1)
+        discount = self._param.get_discount_factor(k)
+        self._totalDiscountedCost += self._param.get_transition_cost(current_state, next_state) * discount
+        self._totalDiscountedUtility += self._param.get_transition_utility(current_state, next_state) * discount
 
     def get_total_discounted_cost(self):
         """ :returns total discounted cost """
@@ -196,38 +242,244 @@ class PatientCostUtilityMonitor:
 
 
 class Cohort:
-    def __init__(self, id, therapy):
+    def __init__(self, id, therapy, streaming=False, pop_size=None, streams=None, recorder=None):
         """ create a cohort of patients
         :param id: an integer to specify the seed of the random number generator
+        :param therapy: selected therapy
+        :param streaming: if True, patients are created, simulated and discarded one at a time when the cohort
+                          is simulated, and only online summary statistics of their outcomes are kept
+        :param pop_size: cohort population size (Data.POP_SIZE if not provided)
+        :param streams: RandomStreams.RandomStreams to draw the random numbers of patient i of this cohort from
+                        (by default patient i seeds its own generator with id * pop_size + i)
+        :param recorder: TrajectoryRecorder.TrajectoryRecorder to record the path of every patient in, in the
+                         order of patient ids (only when patients are simulated in this process)
         """
-        self._initial_pop_size = Data.POP_SIZE
-        self._patients = []      # list of patients
-
-        # populate the cohort
-        for i in range(self._initial_pop_size):
-            # create a new patient (use id * pop_size + i as patient id)
-            patient = Patient(id * self._initial_pop_size + i, P.ParametersFixed(therapy))
-            # add the patient to the cohort
-            self._patients.append(patient)
-
-    def simulate(self):
+        self._id = id
+        self._therapy = therapy
+        self._streaming = streaming
+        self._streams = streams
+        self._recorder = recorder
+        self._initial_pop_size = Data.POP_SIZE if pop_size is None else pop_size
+        self._patients = []      # list of patients (created when the cohort is simulated serially)
+        self._outcomes = None    # outcomes collected from worker processes or loaded from a cache
+        # parameters (shared by all patients of this cohort)
+        self._param = P.ParametersFixed(therapy)
+
+    def simulate(self, n_workers=None, chunk_size=None, cache=None, profiler=None):
         """ simulate the cohort of patients over the specified number of time-steps
+        :param n_workers: number of worker processes to simulate patients in parallel
+                          (None or 1 simulates all patients in this process)
+        :param chunk_size: number of patients sent to a worker at once
+                           (by default each worker receives 4 chunks)
+        :param cache: ResultCache.DiskCache to reuse the outcomes of an identical earlier simulation from
+                      and to store the outcomes of this simulation in (not used in streaming mode)
+        :param profiler: Instrumentation.SimulationProfiler to collect timers and counters of a serial
+                         simulation (None to disable)
         :returns outputs from simulating this cohort
         """
 
-        # simulate all patients
-        for patient in self._patients:
-            patient.simulate(Data.SIM_LENGTH)
+        if profiler is not None:
+            if not (n_workers is None or n_workers <= 1):
+                raise ValueError('Profiling is only supported when patients are simulated in this process.')
+            profiler.start()
+        if self._recorder is not None and not (n_workers is None or n_workers <= 1):
+            raise ValueError('Trajectories are only recorded when patients are simulated in this process.')
+
+        if self._streaming:
+            # outcomes are summarized while the patients are being simulated
+            outputs = CohortOutputsStreaming(
+                self.iterate_patient_outcomes(n_workers, chunk_size, profiler), self._initial_pop_size)
+            if profiler is not None:
+                profiler.stop()
+            return outputs
+
+        # (trajectories are not cached, so the cohort is simulated again when they are recorded)
+        if cache is not None and self._recorder is None:
+            # look up the outcomes of a simulation with the same effective configuration
+            key = Cache.get_fingerprint(self._param, self._id, self._initial_pop_size, Data.SIM_LENGTH,
+                                        None if self._streams is None else self._streams.get_seed())
+            stored_cohort = cache.get(key)
+            if stored_cohort is not None:
+                self._outcomes = stored_cohort.get_outcomes()
+                if profiler is not None:
+                    profiler.stop()
+                return CohortOutputs(self)
+
+        if n_workers is None or n_workers <= 1:
+            # populate the cohort (only after the cache is checked, so a cache hit creates no patients)
+            if len(self._patients) == 0:
+                self.populate()
+            # simulate all patients
+            for patient in self._patients:
+                patient.simulate(Data.SIM_LENGTH, profiler)
+        else:
+            survival_times, count_strokes, costs, utilities = [], [], [], []
+            for survival_time, count_strokes_i, cost, utility in self.iterate_patient_outcomes(n_workers, chunk_size):
+                survival_times.append(survival_time)
+                count_strokes.append(count_strokes_i)
+                costs.append(cost)
+                utilities.append(utility)
+            self._outcomes = survival_times, count_strokes, costs, utilities
+
+        if cache is not None and self._recorder is None:
+            cache.put(key, self)
 
         # return the cohort outputs
-        return CohortOutputs(self)
+        if profiler is None:
+            return CohortOutputs(self)
+
+        start = time.perf_counter()
+        outputs = CohortOutputs(self)
+        profiler.add_time('outputs', time.perf_counter() - start)
+        profiler.stop()
+        return outputs
+
+    def populate(self):
+        """ creates the patients of this cohort (simulate calls it after the cache lookup when patients are
+        simulated in this process; it can be called earlier to time patient construction on its own) """
+        first_id = self._id * self._initial_pop_size
+        self._patients = [Patient(first_id + i, self._param, self._get_patient_rng(i), self._recorder)
+                          for i in range(self._initial_pop_size)]
+
+    def iterate_patient_outcomes(self, n_workers=None, chunk_size=None, profiler=None):
+        """ simulates the patients of this cohort without keeping them
+        :param n_workers: number of worker processes to simulate patients in parallel
+        :param chunk_size: number of patients sent to a worker at once
+        :param profiler: Instrumentation.SimulationProfiler (only used when patients are simulated in this process)
+        :returns a generator of (survival time or None, number of strokes, discounted cost,
+        discounted utility) of each patient, in the order of patient ids
+        """
+
+        first_id = self._id * self._initial_pop_size
+
+        if n_workers is None or n_workers <= 1:
+            for i in range(self._initial_pop_size):
+                patient = Patient(first_id + i, self._param, self._get_patient_rng(i), self._recorder)
+                patient.simulate(Data.SIM_LENGTH, profiler)
+                yield get_patient_outcome(patient)
+        else:
+            # every patient seeds its own random number generator with its id (or draws from its own stream),
+            # so patients can be simulated in any process and the outputs are identical to the serial simulation
+            if chunk_size is None:
+                chunk_size = max(1, -(-self._initial_pop_size // (4 * n_workers)))
+            chunk_starts = range(0, self._initial_pop_size, chunk_size)
+
+            def submit(executor, start):
+                """ submits the simulation of the patients of the chunk that starts at patient start """
+                chunk = range(start, min(start + chunk_size, self._initial_pop_size))
+                rngs = None if self._streams is None else [self._get_patient_rng(i) for i in chunk]
+                return executor.submit(simulate_patients, self._therapy,
+                                       range(first_id + chunk.start, first_id + chunk.stop), Data.SIM_LENGTH, rngs)
+
+            with futures.ProcessPoolExecutor(max_workers=n_workers) as executor:
+                # only a window of 2 * n_workers chunks is submitted at a time (submitting every chunk up front
+                # would keep all pending results in memory); results are returned in the order of chunks
+                window = 2 * n_workers
+                pending = collections.deque(submit(executor, start) for start in chunk_starts[:window])
+                for start in chunk_starts[window:]:
+                    outcomes = pending.popleft().result()
+                    pending.append(submit(executor, start))
+                    yield from outcomes
+                while len(pending) > 0:
+                    yield from pending.popleft().result()
+
+    def _get_patient_rng(self, i):
+        """ :returns the random number generator of patient i (None if patients seed their own) """
+        if self._streams is None:
+            return None
+        return self._streams.get_rng(self._id, i)
+
+    def get_id(self):
+        return self._id
+
+    def get_parameters(self):
+        return self._param
+
+    def get_streams(self):
+        return self._streams
 
     def get_initial_pop_size(self):
         return self._initial_pop_size
 
     def get_patients(self):
+        """ :returns the patients of this cohort (only simulated if the cohort was simulated serially
+        and not loaded from a cache) """
         return self._patients
 
+    def get_outcomes(self):
+        """ :returns (survival times (None for patients who are alive), number of strokes, discounted costs,
+        discounted utilities) of the simulated patients """
+
+        if self._outcomes is not None:
+            return self._outcomes
+        return get_patient_outcomes(self._patients)
+
+
+def get_patient_outcome(patient):
+    """ :returns (survival time or None if alive, number of strokes, discounted cost, discounted utility)
+    of a simulated patient """
+    return patient.get_survival_time(), patient.get_number_of_strokes(), \
+        patient.get_total_discounted_cost(), patient.get_total_discounted_utility()
+
+
+def get_patient_outcomes(patients):
+    """ :returns (survival times (None for patients who are alive), number of strokes, discounted costs,
+    discounted utilities) of the simulated patients
+    :param patients: list of simulated patients
+    """
+
+    survival_times = []
+    count_strokes = []
+    costs = []
+    utilities = []
+    for patient in patients:
+        survival_times.append(patient.get_survival_time())
+        count_strokes.append(patient.get_number_of_strokes())
+        costs.append(patient.get_total_discounted_cost())
+        utilities.append(patient.get_total_discounted_utility())
+
+    return survival_times, count_strokes, costs, utilities
+
+
+def simulate_patients(therapy, patient_ids, sim_length, rngs=None):
+    """ simulates the patients with the specified ids (used by worker processes)
+    :param therapy: selected therapy
+    :param patient_ids: ids of patients to simulate
+    :param sim_length: simulation length
+    :param rngs: random number generators of the patients (by default each patient seeds its own)
+    :returns list of (survival time or None, number of strokes, discounted cost, discounted utility)
+    of the simulated patients
+    """
+
+    param = P.ParametersFixed(therapy)
+    outcomes = []
+    if rngs is None:
+        rngs = [None] * len(patient_ids)
+    for patient_id, rng in zip(patient_ids, rngs):
+        patient = Patient(patient_id, param, rng)
+        patient.simulate(sim_length)
+        outcomes.append(get_patient_outcome(patient))
+
+    return outcomes
+
+
+def replay_patient(therapy, cohort_id, patient_index, streams, sim_length=None):
+    """ simulates one patient of a cohort that was simulated with random streams again (for debugging);
+    the patient's random numbers are computed directly from its stream, so no other patient is simulated
+    :param therapy: selected therapy
+    :param cohort_id: id of the cohort
+    :param patient_index: index of the patient in the cohort
+    :param streams: RandomStreams.RandomStreams the cohort was simulated with
+    :param sim_length: simulation length (Data.SIM_LENGTH if not provided)
+    :returns the simulated patient
+    """
+
+    if sim_length is None:
+        sim_length = Data.SIM_LENGTH
+    patient = Patient(patient_index, P.ParametersFixed(therapy), streams.get_rng(cohort_id, patient_index))
+    patient.simulate(sim_length)
+    return patient
+
 
 class CohortOutputs:
     def __init__(self, simulated_cohort):
@@ -235,44 +487,51 @@ class CohortOutputs:
         :param simulated_cohort: a cohort after being simulated
         """
 
-        self._survivalTimes = []        # patients' survival times
-        self._times_to_Stroke = []      # patients' times to stroke
-        self._count_strokes = []        # patients' number of strokes
-        self._costs = []                # patients' discounted total costs
-        self._utilities = []            # patients' discounted total utilities
-
-        # survival curve
-        self._survivalCurve = \
-            PathCls.SamplePathBatchUpdate('Population size over time', id, simulated_cohort.get_initial_pop_size())
-
-        # find patients' survival times
-        for patient in simulated_cohort.get_patients():
+        # patients' survival times, number of strokes, discounted total costs and utilities
+        # (as NumPy arrays of the same types whichever engine simulated the cohort or cache it was loaded from)
+        survival_times, count_strokes, costs, utilities = simulated_cohort.get_outcomes()
+        self._count_strokes = np.asarray(count_strokes, dtype=np.int32)
+        self._costs = np.asarray(costs, dtype=np.float64)
+        self._utilities = np.asarray(utilities, dtype=np.float64)
 
-            # get the patient survival time
-            survival_time = patient.get_survival_time()
-            if not (survival_time is None):
-                self._survivalTimes.append(survival_time)           # store the survival time of this patient
-                self._survivalCurve.record(survival_time, -1)       # update the survival curve
+        # id and random streams of the cohort (None if not known), to check that two cohorts can be paired
+        self._cohortId = simulated_cohort.get_id() if hasattr(simulated_cohort, 'get_id') else None
+        self._streams = simulated_cohort.get_streams() if hasattr(simulated_cohort, 'get_streams') else None
 
-            count_strokes = patient.get_number_of_strokes()
-            self._count_strokes.append(count_strokes)
+        # survival time of each patient (nan for patients who are alive at the end of simulation)
+        self._survivalTimesByPatient = np.array(survival_times, dtype=float)
+        # survival times of patients who have died
+        self._survivalTimes = self._survivalTimesByPatient[~np.isnan(self._survivalTimesByPatient)].tolist()
 
-            # cost and utility
-            self._costs.append(patient.get_total_discounted_cost())
-            self._utilities.append(patient.get_total_discounted_utility())
+        # survival curve
+        self._survivalCurve = Survival.SurvivalCurve('Population size over time', 0, self._survivalTimesByPatient)
 
         # summary statistics
+        import scr.StatisticalClasses as StatCls
         self._sumStat_survivalTime = StatCls.SummaryStat('Patient survival time', self._survivalTimes)
         self._sumState_number_strokes = StatCls.SummaryStat('Time until stroke', self._count_strokes)
         self._sumStat_cost = StatCls.SummaryStat('Patient discounted cost', self._costs)
         self._sumStat_utility = StatCls.SummaryStat('Patient discounted utility', self._utilities)
 
+    def get_cohort_id(self):
+        """ :returns the id of the simulated cohort (None if not known) """
+        return self._cohortId
+
+    def get_streams_seed(self):
+        """ :returns the seed of the random streams of the simulated cohort (None if it used none) """
+        return None if self._streams is None else self._streams.get_seed()
+
     def get_if_developed_stroke(self):
         return self._count_strokes
 
     def get_survival_times(self):
         return self._survivalTimes
 
+    def get_survival_times_by_patient(self):
+        """ :returns survival time of each patient in the order of patient ids
+        (nan for patients who are alive at the end of simulation) """
+        return self._survivalTimesByPatient
+
     def get_costs(self):
         return self._costs
 
@@ -293,3 +552,46 @@ class CohortOutputs:
 
     def get_sumStat_count_strokes(self):
         return self._sumState_number_strokes
+
+
+class CohortOutputsStreaming:
+    def __init__(self, patient_outcomes, initial_pop_size):
+        """ summarizes the outcomes of patients as they are simulated, without storing them
+        (same summary statistics and survival curve getters as CohortOutputs)
+        :param patient_outcomes: iterable of (survival time or None, number of strokes, discounted cost,
+                                 discounted utility) of each patient
+        :param initial_pop_size: cohort population size
+        """
+
+        self._sumStat_survivalTime = OnlineStat.OnlineSummaryStat('Patient survival time')
+        self._sumState_number_strokes = OnlineStat.OnlineSummaryStat('Time until stroke')
+        self._sumStat_cost = OnlineStat.OnlineSummaryStat('Patient discounted cost')
+        self._sumStat_utility = OnlineStat.OnlineSummaryStat('Patient discounted utility')
+        self._survivalHistogram = OnlineStat.SurvivalHistogram('Population size over time', initial_pop_size)
+
+        for survival_time, count_strokes, cost, utility in patient_outcomes:
+            # survival time is only recorded for patients who have died
+            if not (survival_time is None):
+                self._sumStat_survivalTime.record(survival_time)
+                self._survivalHistogram.record(survival_time)
+            self._sumState_number_strokes.record(count_strokes)
+            self._sumStat_cost.record(cost)
+            self._sumStat_utility.record(utility)
+
+    def get_sumStat_survival_times(self):
+        return self._sumStat_survivalTime
+
+    def get_sumStat_discounted_cost(self):
+        return self._sumStat_cost
+
+    def get_sumStat_discounted_utility(self):
+        return self._sumStat_utility
+
+    def get_sumStat_count_strokes(self):
+        return self._sumState_number_strokes
+
+    def get_survival_histogram(self):
+        return self._survivalHistogram
+
+    def get_survival_curve(self):
+        return self._survivalHistogram.get_survival_curve()
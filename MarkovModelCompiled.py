@@ -0,0 +1,236 @@
+import math
+import os
+import time
+import numpy as np
+import ParameterClasses as P
+import RandomStreams as Streams
+import MarkovModel as MarkovCls
+import InputData as Data
+
+# compiled cohort runs the per-patient simulation loop (state transitions, stroke counting, survival time and
+# discounted cost and utility accrual) as one Numba kernel over NumPy arrays, with patients simulated in
+# parallel threads. Every patient seeds the Mersenne Twister with its id, as MarkovModel.Patient does (or draws
+# from its counter-based stream of RandomStreams), so the outcomes are identical to those of
+# MarkovModel.Cohort. Numba is optional: if it is not installed, patients are simulated with the pure-Python
+# engine (MarkovModel.Patient).
+try:
+    import numba
+except ImportError:
+    numba = None
+
+
+def _get_stream_uniform(key, counter):
+    """ :returns the counter-th uniform of the counter-based stream with the key
+    (same as RandomStreams.get_uniforms, compiled with Numba) """
+    z = key + np.uint64(counter + 1) * np.uint64(Streams._GOLDEN)
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(Streams._MIX_1)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(Streams._MIX_2)
+    z = z ^ (z >> np.uint64(31))
+    return (z >> np.uint64(11)) * 2.0**-53
+
+
+def _simulate_patients(seeds, stream_keys, initial_state, sim_length, delta_t, cum_probs, band_index,
+                       cost_table, utility_table, discount_factors, death, stroke,
+                       survival_times, count_strokes, costs, utilities):
+    """ simulates patients and writes their outcomes to the output arrays (compiled with Numba)
+    :param seeds: seed of the random number generator of each patient (patient ids)
+    :param stream_keys: keys of the counter-based streams of the patients (empty to use the seeds instead)
+    :param initial_state: initial health state
+    :param sim_length: simulation length
+    :param delta_t: length of time step
+    :param cum_probs: cumulative transition probabilities of each age band (bands x states x states)
+    :param band_index: age band of each time step
+    :param cost_table: cost of each (current state, next state) transition
+    :param utility_table: utility of each (current state, next state) transition
+    :param discount_factors: discount factor of each time step
+    :param death: index of the death state
+    :param stroke: index of the stroke state
+    """
+
+    n_states = cum_probs.shape[2]
+    if_streams = len(stream_keys) > 0
+
+    # patients are independent, so they are simulated in parallel
+    for i in prange(len(seeds)):
+
+        # the random number generator of each thread is reseeded for every patient
+        if not if_streams:
+            np.random.seed(seeds[i])
+
+        state = initial_state
+        survival_time = np.nan
+        strokes = 0
+        cost = 0.0
+        utility = 0.0
+
+        k = 0  # current time step
+        # while the patient is alive and simulation length is not yet reached
+        while state != death and k*delta_t < sim_length:
+
+            # sample the next state (the first state whose cumulative probability exceeds the uniform)
+            if if_streams:
+                u = _get_stream_uniform(stream_keys[i], k)
+            else:
+                u = np.random.random()
+            cum_prob = cum_probs[band_index[k], state]
+            next_state = 0
+            while next_state < n_states and cum_prob[next_state] <= u:
+                next_state += 1
+
+            # update survival time (the 0.5 is a half cycle correction)
+            if next_state == death:
+                survival_time = (k + 0.5) * delta_t
+
+            # count strokes
+            if state == stroke:
+                strokes += 1
+
+            # update total discounted cost and utility (corrected for the half-cycle effect)
+            cost += cost_table[state, next_state] * discount_factors[k]
+            utility += utility_table[state, next_state] * discount_factors[k]
+
+            state = next_state
+            k += 1
+
+        survival_times[i] = survival_time
+        count_strokes[i] = strokes
+        costs[i] = cost
+        utilities[i] = utility
+
+
+if numba is not None:
+    # the TBB threading layer hangs when the process later forks worker processes (MarkovModel.Cohort with
+    # n_workers), so fork-safe layers are preferred unless NUMBA_THREADING_LAYER is set
+    if 'NUMBA_THREADING_LAYER' not in os.environ:
+        numba.config.THREADING_LAYER_PRIORITY = ['omp', 'workqueue', 'tbb']
+    prange = numba.prange
+    _get_stream_uniform = numba.njit(cache=True)(_get_stream_uniform)
+    _simulate_patients = numba.njit(parallel=True, cache=True)(_simulate_patients)
+else:
+    prange = range
+
+
+def if_compiled():
+    """ :returns True if the compiled kernel is available (Numba is installed) """
+    return numba is not None
+
+
+class Cohort:
+    def __init__(self, id, therapy, pop_size=None, parameters=None, streams=None):
+        """ create a cohort of patients
+        :param id: an integer to specify the seed of the random number generator
+        :param therapy: selected therapy
+        :param pop_size: cohort population size (Data.POP_SIZE if not provided)
+        :param parameters: parameter object (ParametersFixed of the selected therapy if not provided)
+        :param streams: RandomStreams.RandomStreams to draw the random numbers of patient i of this cohort from
+                        (by default patient i seeds its own generator with id * pop_size + i, which must be
+                        below 2**32)
+        """
+        self._id = id
+        self._streams = streams
+        self._initial_pop_size = Data.POP_SIZE if pop_size is None else pop_size
+        # parameters (shared by all patients of this cohort)
+        self._param = P.ParametersFixed(therapy) if parameters is None else parameters
+
+        n = self._initial_pop_size
+        # survival times (nan for patients who are still alive)
+        self._survivalTimes = np.full(n, np.nan)
+        # number of strokes
+        self._strokeCounts = np.zeros(n, dtype=np.int32)
+        # discounted total costs and utilities
+        self._costs = np.zeros(n)
+        self._utilities = np.zeros(n)
+
+    def simulate(self, sim_length=None, profiler=None):
+        """ simulate the cohort of patients over the specified simulation length
+        :param sim_length: simulation length (Data.SIM_LENGTH if not provided)
+        :param profiler: Instrumentation.SimulationProfiler to collect timers (None to disable); the compiled
+                         kernel is not instrumented, so only the wall time and the outputs phase are recorded
+        :returns outputs from simulating this cohort
+        """
+
+        if profiler is not None:
+            profiler.start()
+
+        self.simulate_outcomes(sim_length)
+
+        # return the cohort outputs
+        start = time.perf_counter()
+        outputs = MarkovCls.CohortOutputs(self)
+        if profiler is not None:
+            profiler.add_time('outputs', time.perf_counter() - start)
+            profiler.stop()
+        return outputs
+
+    def simulate_outcomes(self, sim_length=None):
+        """ simulate the cohort of patients without building the cohort outputs
+        :param sim_length: simulation length (Data.SIM_LENGTH if not provided)
+        :returns (survival times (nan for patients who are alive), number of strokes, discounted costs,
+        discounted utilities) of the simulated patients
+        """
+
+        if sim_length is None:
+            sim_length = Data.SIM_LENGTH
+
+        # patient ids are used as seeds, as in MarkovModel.Cohort
+        first_id = self._id * self._initial_pop_size
+        seeds = np.arange(first_id, first_id + self._initial_pop_size, dtype=np.int64)
+        # np.random.seed (in the kernel and in MarkovModel.Patient) only accepts seeds in [0, 2**32)
+        if self._streams is None and (first_id < 0 or first_id + self._initial_pop_size > 2**32):
+            raise ValueError('Patient ids {} to {} are not valid seeds (0 to 2**32-1); use a smaller cohort id '
+                             'or random streams.'.format(first_id, first_id + self._initial_pop_size - 1))
+
+        if numba is None:
+            # fall back to the pure-Python engine
+            for i, seed in enumerate(seeds.tolist()):
+                rng = None if self._streams is None else self._streams.get_rng(self._id, i)
+                patient = MarkovCls.Patient(seed, self._param, rng)
+                patient.simulate(sim_length)
+                survival_time, self._strokeCounts[i], self._costs[i], self._utilities[i] = \
+                    MarkovCls.get_patient_outcome(patient)
+                if survival_time is not None:
+                    self._survivalTimes[i] = survival_time
+            return self.get_outcomes()
+
+        delta_t = self._param.get_delta_t()
+        # tables cover every time step the loop can reach
+        n_time_steps = math.ceil(sim_length / delta_t) + 1
+
+        if self._streams is None:
+            stream_keys = np.zeros(0, dtype=np.uint64)
+        else:
+            stream_keys = self._streams.get_keys(self._id, np.arange(self._initial_pop_size))
+
+        _simulate_patients(
+            seeds,
+            stream_keys,
+            self._param.get_initial_health_state().value,
+            float(sim_length),
+            float(delta_t),
+            self._param.get_cum_prob_matrices(),
+            self._param.get_band_index(n_time_steps),
+            self._param.get_transition_cost_matrix(),
+            self._param.get_transition_utility_matrix(),
+            self._param.get_discount_factors(n_time_steps),
+            P.HealthStats.DEATH.value,
+            P.HealthStats.STROKE.value,
+            self._survivalTimes, self._strokeCounts, self._costs, self._utilities)
+
+        return self.get_outcomes()
+
+    def get_id(self):
+        return self._id
+
+    def get_parameters(self):
+        return self._param
+
+    def get_streams(self):
+        return self._streams
+
+    def get_initial_pop_size(self):
+        return self._initial_pop_size
+
+    def get_outcomes(self):
+        """ :returns (survival times (nan for patients who are alive), number of strokes, discounted costs,
+        discounted utilities) of the simulated patients """
+        return self._survivalTimes, self._strokeCounts, self._costs, self._utilities
@@ -0,0 +1,172 @@
+import math
+import numpy as np
+import ParameterClasses as P
+import MarkovModelVectorized as VecCls
+import InputData as Data
+
+# cohort trace propagates the expected state occupancy of a cohort through the transition probability matrix
+# instead of sampling patients, so it returns the exact expected outcomes of the Monte Carlo model
+
+
+class CohortTrace:
+    def __init__(self, therapy, parameters=None):
+        """ create a deterministic cohort
+        :param therapy: selected therapy
+        :param parameters: parameter object (ParametersFixed of the selected therapy if not provided)
+        """
+        self._param = P.ParametersFixed(therapy) if parameters is None else parameters
+
+    def simulate(self, sim_length=None):
+        """ propagates the state occupancy over the specified simulation length
+        :param sim_length: simulation length (Data.SIM_LENGTH if not provided)
+        :returns expected outcomes of this cohort
+        """
+
+        if sim_length is None:
+            sim_length = Data.SIM_LENGTH
+
+        # transition probability matrix of each age band
+        prob_matrices = self._param.get_prob_matrices()
+        cost_table = self._param.get_transition_cost_matrix()
+        utility_table = self._param.get_transition_utility_matrix()
+
+        delta_t = self._param.get_delta_t()
+        death = P.HealthStats.DEATH.value
+        stroke = P.HealthStats.STROKE.value
+        band_index = self._param.get_band_index(math.ceil(sim_length / delta_t) + 1)
+
+        # expected (not discounted) cost and utility of leaving each state in one time step (bands x states)
+        expected_costs = (prob_matrices * cost_table).sum(axis=2)
+        expected_utilities = (prob_matrices * utility_table).sum(axis=2)
+        # deceased patients are no longer updated
+        expected_costs[:, death] = 0
+        expected_utilities[:, death] = 0
+        # states of alive patients (health states and tunnel states)
+        alive = [s.value for s in self._param.get_model_states() if s != P.HealthStats.DEATH]
+
+        # state occupancy at the start of the simulation
+        occupancy = np.zeros(len(self._param.get_model_states()))
+        occupancy[self._param.get_initial_health_state().value] = 1
+        trace = [occupancy]
+
+        total_survival_time = 0     # sum of survival times weighted by the probability of death
+        prob_death = 0              # probability of dying within the simulation length
+        count_strokes = 0
+
+        # expected cost and utility of the cohort in each time step
+        costs = []
+        utilities = []
+
+        k = 0  # current time step
+        while k*delta_t < sim_length:
+
+            prob_matrix = prob_matrices[band_index[k]]
+            costs.append(occupancy.dot(expected_costs[band_index[k]]))
+            utilities.append(occupancy.dot(expected_utilities[band_index[k]]))
+
+            # probability of dying in this time step
+            prob_death_k = occupancy[alive].dot(prob_matrix[alive, death])
+            prob_death += prob_death_k
+            # the 0.5 is a half cycle correction
+            total_survival_time += (k + 0.5) * delta_t * prob_death_k
+
+            # number of strokes are counted when leaving the stroke state
+            count_strokes += occupancy[stroke]
+
+            # state occupancy at the next time step
+            occupancy = occupancy.dot(prob_matrix)
+            trace.append(occupancy)
+
+            # increment time step
+            k += 1
+
+        # occupancy of each health state (tunnel states are added to their health state)
+        trace = np.array(trace)
+        health_state_trace = np.zeros((len(trace), len(P.HealthStats)))
+        np.add.at(health_state_trace.T, self._param.get_health_state_index(), trace.T)
+
+        # discounted total cost and utility (corrected for the half-cycle effect)
+        discount_factors = self._param.get_discount_factors(k)
+        discounted_cost = discount_factors.dot(costs)
+        discounted_utility = discount_factors.dot(utilities)
+
+        return CohortTraceOutputs(
+            trace=health_state_trace,
+            mean_survival_time=total_survival_time / prob_death if prob_death > 0 else None,
+            mean_count_strokes=count_strokes,
+            mean_discounted_cost=discounted_cost,
+            mean_discounted_utility=discounted_utility)
+
+    def solve_infinite_horizon(self):
+        """ :returns the expected outcomes over an infinite simulation length, calculated in closed form
+        from the fundamental matrix of the absorbing Markov chain (requires time-invariant transition
+        probabilities) """
+
+        if self._param.get_n_bands() > 1:
+            raise ValueError('The closed-form solution requires time-invariant transition probabilities.')
+
+        prob_matrix = VecCls.get_prob_matrix(self._param)
+        cost_table = self._param.get_transition_cost_matrix()
+        utility_table = self._param.get_transition_utility_matrix()
+
+        delta_t = self._param.get_delta_t()
+        discount_rate = self._param.get_adj_discount_rate() / 2
+
+        # transient (alive) states and the transition probabilities among them
+        transient = [s.value for s in self._param.get_model_states() if s != P.HealthStats.DEATH]
+        q = prob_matrix[np.ix_(transient, transient)]
+        identity = np.identity(len(transient))
+
+        # initial state
+        initial = np.zeros(len(transient))
+        initial[transient.index(self._param.get_initial_health_state().value)] = 1
+
+        # expected number of time steps spent in each transient state (first row of the fundamental matrix)
+        time_steps = np.linalg.solve((identity - q).T, initial)
+
+        # the discount factor of time step k is (1+r)^-(2k+1) = (1+r)^-1 * ((1+r)^-2)^k
+        discounted_time_steps = np.linalg.solve((identity - pow(1 + discount_rate, -2) * q).T, initial) \
+            / (1 + discount_rate)
+
+        # expected (not discounted) cost and utility of leaving each transient state in one time step
+        expected_cost = (prob_matrix * cost_table).sum(axis=1)[transient]
+        expected_utility = (prob_matrix * utility_table).sum(axis=1)[transient]
+
+        # patients die in the last time step they spend alive (the 0.5 is a half cycle correction)
+        return CohortTraceOutputs(
+            trace=None,
+            mean_survival_time=(time_steps.sum() - 0.5) * delta_t,
+            mean_count_strokes=time_steps[transient.index(P.HealthStats.STROKE.value)],
+            mean_discounted_cost=discounted_time_steps.dot(expected_cost),
+            mean_discounted_utility=discounted_time_steps.dot(expected_utility))
+
+
+class CohortTraceOutputs:
+    def __init__(self, trace, mean_survival_time, mean_count_strokes, mean_discounted_cost, mean_discounted_utility):
+        """ expected outcomes of a deterministic cohort
+        :param trace: state occupancy at each time step (one row per time step, None if not available)
+        :param mean_survival_time: expected survival time of patients who die
+        :param mean_count_strokes: expected number of strokes per patient
+        :param mean_discounted_cost: expected discounted total cost per patient
+        :param mean_discounted_utility: expected discounted total utility per patient
+        """
+        self._trace = trace
+        self._meanSurvivalTime = mean_survival_time
+        self._meanCountStrokes = mean_count_strokes
+        self._meanDiscountedCost = mean_discounted_cost
+        self._meanDiscountedUtility = mean_discounted_utility
+
+    def get_trace(self):
+        return self._trace
+
+    def get_mean_survival_time(self):
+        return self._meanSurvivalTime
+
+    def get_mean_count_strokes(self):
+        return self._meanCountStrokes
+
+    def get_mean_discounted_cost(self):
+        return self._meanDiscountedCost
+
+    def get_mean_discounted_utility(self):
+        return self._meanDiscountedUtility
@@ -0,0 +1,245 @@
+import math
+import time
+import numpy as np
+import scr.RandomVariantGenerators as rndClasses
+import RandomStreams as Streams
+import ParameterClasses as P
+import MarkovModel as MarkovCls
+import InputData as Data
+
+# event-driven cohort jumps from one transition to the next instead of stepping through every time step:
+# the number of time steps a patient stays in its current state follows a geometric distribution, so it is
+# sampled directly, and the discounted cost and utility of the whole stay are accrued in closed form.
+# The outcomes have the same distribution as those of the time-step engines (MarkovModel and
+# MarkovModelVectorized), but the number of random draws and loop iterations grows with the number of
+# transitions rather than with the number of time steps. With random streams, every patient draws the uniforms
+# of its own stream in order, so its outcomes do not depend on the other patients of the cohort.
+
+
+class Cohort:
+    def __init__(self, id, therapy, pop_size=None, parameters=None, streams=None):
+        """ create a cohort of patients
+        :param id: an integer to specify the seed of the random number generator
+        :param therapy: selected therapy
+        :param pop_size: cohort population size (Data.POP_SIZE if not provided)
+        :param parameters: parameter object (ParametersFixed of the selected therapy if not provided)
+        :param streams: RandomStreams.RandomStreams to draw the random numbers of patient i of this cohort from
+                        (by default one generator seeded with id is used for the whole cohort)
+        """
+        self._id = id
+        self._streams = streams
+        self._initial_pop_size = Data.POP_SIZE if pop_size is None else pop_size
+        # parameters (shared by all patients of this cohort)
+        self._param = P.ParametersFixed(therapy) if parameters is None else parameters
+
+        n = self._initial_pop_size
+        # current state of each patient (an index into the transition probability matrices, which have more
+        # rows than health states when the stroke state is expanded into tunnel states at short time steps)
+        self._states = np.full(n, self._param.get_initial_health_state().value, dtype=np.intp)
+        # survival times (nan for patients who are still alive)
+        self._survivalTimes = np.full(n, np.nan)
+        # number of strokes
+        self._strokeCounts = np.zeros(n, dtype=np.int32)
+        # discounted total costs and utilities
+        self._costs = np.zeros(n)
+        self._utilities = np.zeros(n)
+
+    def simulate(self, sim_length=None, profiler=None):
+        """ simulate the cohort of patients over the specified simulation length
+        :param sim_length: simulation length (Data.SIM_LENGTH if not provided)
+        :param profiler: Instrumentation.SimulationProfiler to collect timers and counters (None to disable)
+        :returns outputs from simulating this cohort
+        """
+
+        if profiler is not None:
+            profiler.start()
+
+        self.simulate_outcomes(sim_length, profiler)
+
+        # return the cohort outputs
+        start = time.perf_counter()
+        outputs = MarkovCls.CohortOutputs(self)
+        if profiler is not None:
+            profiler.add_time('outputs', time.perf_counter() - start)
+            profiler.stop()
+        return outputs
+
+    def simulate_outcomes(self, sim_length=None, profiler=None):
+        """ simulate the cohort of patients without building the cohort outputs
+        :param sim_length: simulation length (Data.SIM_LENGTH if not provided)
+        :param profiler: Instrumentation.SimulationProfiler to collect timers and counters (None to disable)
+        :returns (survival times (nan for patients who are alive), number of strokes, discounted costs,
+        discounted utilities) of the simulated patients
+        """
+
+        if sim_length is None:
+            sim_length = Data.SIM_LENGTH
+
+        # random number generator for this cohort (or the keys of the streams of its patients)
+        start = time.perf_counter()
+        if self._streams is None:
+            rng = rndClasses.RNG(self._id)
+        else:
+            keys = self._streams.get_keys(self._id, np.arange(self._initial_pop_size))
+            # number of uniforms each patient has drawn from its stream
+            draws = np.zeros(self._initial_pop_size, dtype=np.int64)
+        if profiler is not None:
+            profiler.add_time('rng_init', time.perf_counter() - start)
+
+        # transition probability matrix of each age band (bands x states x states)
+        prob_matrices = self._param.get_prob_matrices()
+        n_states = prob_matrices.shape[1]
+        # probability of staying in each state for one more time step (bands x states)
+        prob_stay = prob_matrices.diagonal(axis1=1, axis2=2).copy()
+        # cumulative probabilities of the next state given that the patient leaves its current state
+        prob_leave = prob_matrices * (1 - np.identity(n_states))
+        row_sums = prob_leave.sum(axis=2, keepdims=True)
+        cum_prob_leave = np.cumsum(np.divide(prob_leave, row_sums, out=np.zeros_like(prob_leave),
+                                             where=row_sums > 0), axis=2)
+        cum_prob_leave[:, :, -1] = 1
+        # log of the probability of staying (used to sample geometric sojourn times by inversion)
+        with np.errstate(divide='ignore'):
+            log_prob_stay = np.log(prob_stay)
+
+        # cost and utility of each (current state, next state) transition
+        cost_table = self._param.get_transition_cost_matrix()
+        utility_table = self._param.get_transition_utility_matrix()
+
+        # the discount factor of time step k is a*b^k with a = (1+r)^-1 and b = (1+r)^-2
+        # (r is half of the adjusted discount rate, see ParameterClasses._calculate_discount_factor)
+        a = pow(1 + self._param.get_adj_discount_rate() / 2, -1)
+        b = a * a
+
+        delta_t = self._param.get_delta_t()
+        n_time_steps = get_n_time_steps(sim_length, delta_t)
+        death = P.HealthStats.DEATH.value
+        stroke = P.HealthStats.STROKE.value
+
+        # age band of each time step and the first time step of the next age band (or the end of the simulation);
+        # transition probabilities are constant within a band, so sojourn times are sampled band by band
+        band_index = self._param.get_band_index(n_time_steps)
+        band_changes = np.flatnonzero(np.diff(band_index)) + 1
+        band_ends = np.append(band_changes, n_time_steps)[
+            np.searchsorted(band_changes, np.arange(n_time_steps), side='right')]
+
+        # time step at which each patient entered its current state (or its current age band)
+        steps = np.zeros(self._initial_pop_size, dtype=np.int64)
+        # indices of the patients who are still alive and have time steps left to simulate
+        active = np.flatnonzero(self._states != death)
+
+        while active.size > 0:
+
+            time_0 = time.perf_counter()
+
+            current_states = self._states[active]
+            current_steps = steps[active]
+            current_bands = band_index[current_steps]
+
+            # number of additional time steps spent in the current state before leaving it
+            # (geometric number of failures with success probability 1 - prob_stay, sampled by inversion);
+            # uniforms are drawn for the active patients only, since most of the cohort has usually died or
+            # reached the end of the simulation after the first few transitions
+            if self._streams is None:
+                u = 1 - rng.random_sample(active.size)
+            else:
+                # the next uniform of the stream of each active patient
+                u = 1 - Streams.get_uniforms(keys[active], draws[active])
+                draws[active] += 1
+            current_prob_stay = prob_stay[current_bands, current_states]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                stays = np.floor(np.log(u) / log_prob_stay[current_bands, current_states])
+            stays[current_prob_stay == 0] = 0
+            stays[current_prob_stay == 1] = np.inf
+
+            # patients who would leave after the end of the age band (or the simulation length) stay until
+            # its end; since sojourn times are memoryless, the rest of their stay is sampled in the next band
+            remaining = band_ends[current_steps] - current_steps
+            if_leave = stays < remaining
+            stays = np.where(if_leave, stays, remaining).astype(np.int64)
+
+            time_1 = time.perf_counter()
+
+            # discounted cost and utility of staying for the sampled number of time steps
+            # (sum of a*b^j over j = k, ..., k+stays-1)
+            if b < 1:
+                discount_stay = a * np.power(b, current_steps) * (1 - np.power(b, stays)) / (1 - b)
+            else:
+                discount_stay = a * stays
+            self._costs[active] += cost_table[current_states, current_states] * discount_stay
+            self._utilities[active] += utility_table[current_states, current_states] * discount_stay
+
+            # strokes are counted at every time step spent in the stroke state
+            self._strokeCounts[active] += np.where(current_states == stroke, stays + if_leave, 0).astype(np.int32)
+
+            time_2 = time.perf_counter()
+
+            # sample the state that the leaving patients move to
+            leaving = active[if_leave]
+            leaving_states = current_states[if_leave]
+            leave_steps = current_steps[if_leave] + stays[if_leave]
+            if self._streams is None:
+                u = rng.random_sample(leaving.size)
+            else:
+                u = Streams.get_uniforms(keys[leaving], draws[leaving])
+                draws[leaving] += 1
+            new_states = (cum_prob_leave[current_bands[if_leave], leaving_states] <= u[:, np.newaxis]).sum(axis=1)
+
+            time_3 = time.perf_counter()
+
+            # discounted cost and utility of the transition
+            discount_leave = a * np.power(b, leave_steps)
+            self._costs[leaving] += cost_table[leaving_states, new_states] * discount_leave
+            self._utilities[leaving] += utility_table[leaving_states, new_states] * discount_leave
+
+            time_4 = time.perf_counter()
+
+            # update survival time of patients who die (the 0.5 is a half cycle correction)
+            if_died = new_states == death
+            self._survivalTimes[leaving[if_died]] = (leave_steps[if_died] + 0.5) * delta_t
+
+            # update health states
+            self._states[leaving] = new_states
+            steps[leaving] = leave_steps + 1
+            # patients who reached the end of their age band continue in the next band
+            staying = active[~if_leave]
+            steps[staying] = current_steps[~if_leave] + stays[~if_leave]
+            active = np.sort(np.concatenate((
+                staying[steps[staying] < n_time_steps],
+                leaving[~if_died & (leave_steps + 1 < n_time_steps)])))
+
+            if profiler is not None:
+                profiler.record_draws(current_states.size + leaving.size)
+                profiler.add_time('sampling', (time_1 - time_0) + (time_3 - time_2))
+                profiler.add_time('cost_accrual', (time_2 - time_1) + (time_4 - time_3))
+                profiler.add_time('state_update', time.perf_counter() - time_4)
+
+        return self.get_outcomes()
+
+    def get_id(self):
+        return self._id
+
+    def get_parameters(self):
+        return self._param
+
+    def get_streams(self):
+        return self._streams
+
+    def get_initial_pop_size(self):
+        return self._initial_pop_size
+
+    def get_outcomes(self):
+        """ :returns (survival times (nan for patients who are alive), number of strokes, discounted costs,
+        discounted utilities) of the simulated patients """
+        return self._survivalTimes, self._strokeCounts, self._costs, self._utilities
+
+
+def get_n_time_steps(sim_length, delta_t):
+    """ :returns the number of time steps k = 0, 1, 2, ... with k*delta_t < sim_length
+    (the time steps simulated by the time-step engines) """
+    n = math.ceil(sim_length / delta_t)
+    # correct for the rounding of sim_length / delta_t
+    while n > 0 and (n - 1) * delta_t >= sim_length:
+        n -= 1
+    while n * delta_t < sim_length:
+        n += 1
+    return n
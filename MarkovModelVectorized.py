@@ -0,0 +1,173 @@
+import math
+import time
+import numpy as np
+import scr.RandomVariantGenerators as rndClasses
+import RandomStreams as Streams
+import ParameterClasses as P
+import MarkovModel as MarkovCls
+import InputData as Data
+
+# vectorized cohort simulates all patients of a cohort at once: the state of every patient is kept in
+# NumPy arrays of length pop_size and the whole cohort is advanced one time step at a time
+
+
+class Cohort:
+    def __init__(self, id, therapy, pop_size=None, parameters=None, streams=None):
+        """ create a cohort of patients
+        :param id: an integer to specify the seed of the random number generator
+        :param therapy: selected therapy
+        :param pop_size: cohort population size (Data.POP_SIZE if not provided)
+        :param parameters: parameter object (ParametersFixed of the selected therapy if not provided)
+        :param streams: RandomStreams.RandomStreams to draw the random numbers of patient i of this cohort from
+                        (by default one generator seeded with id is used for the whole cohort)
+        """
+        self._id = id
+        self._streams = streams
+        self._initial_pop_size = Data.POP_SIZE if pop_size is None else pop_size
+        # parameters (shared by all patients of this cohort)
+        self._param = P.ParametersFixed(therapy) if parameters is None else parameters
+
+        n = self._initial_pop_size
+        # current state of each patient (an index into the transition probability matrices, which have more
+        # rows than health states when the stroke state is expanded into tunnel states at short time steps)
+        self._states = np.full(n, self._param.get_initial_health_state().value, dtype=np.intp)
+        # survival times (nan for patients who are still alive)
+        self._survivalTimes = np.full(n, np.nan)
+        # number of strokes
+        self._strokeCounts = np.zeros(n, dtype=np.int32)
+        # discounted total costs and utilities
+        self._costs = np.zeros(n)
+        self._utilities = np.zeros(n)
+
+    def simulate(self, sim_length=None, profiler=None):
+        """ simulate the cohort of patients over the specified simulation length
+        :param sim_length: simulation length (Data.SIM_LENGTH if not provided)
+        :param profiler: Instrumentation.SimulationProfiler to collect timers and counters (None to disable)
+        :returns outputs from simulating this cohort
+        """
+
+        if profiler is not None:
+            profiler.start()
+
+        self.simulate_outcomes(sim_length, profiler)
+
+        # return the cohort outputs
+        start = time.perf_counter()
+        outputs = MarkovCls.CohortOutputs(self)
+        if profiler is not None:
+            profiler.add_time('outputs', time.perf_counter() - start)
+            profiler.stop()
+        return outputs
+
+    def simulate_outcomes(self, sim_length=None, profiler=None):
+        """ simulate the cohort of patients without building the cohort outputs
+        :param sim_length: simulation length (Data.SIM_LENGTH if not provided)
+        :param profiler: Instrumentation.SimulationProfiler to collect timers and counters (None to disable)
+        :returns (survival times (nan for patients who are alive), number of strokes, discounted costs,
+        discounted utilities) of the simulated patients
+        """
+
+        if sim_length is None:
+            sim_length = Data.SIM_LENGTH
+
+        # random number generator for this cohort (or the keys of the streams of its patients)
+        start = time.perf_counter()
+        if self._streams is None:
+            rng = rndClasses.RNG(self._id)
+        else:
+            keys = self._streams.get_keys(self._id, np.arange(self._initial_pop_size))
+        if profiler is not None:
+            profiler.add_time('rng_init', time.perf_counter() - start)
+
+        # cumulative transition probabilities of each age band; a uniform u falls into the next state j
+        # where cum_prob[i, j-1] <= u < cum_prob[i, j]
+        cum_probs = self._param.get_cum_prob_matrices()
+        # cost and utility of each (current state, next state) transition
+        cost_table = self._param.get_transition_cost_matrix()
+        utility_table = self._param.get_transition_utility_matrix()
+
+        delta_t = self._param.get_delta_t()
+        death = P.HealthStats.DEATH.value
+        stroke = P.HealthStats.STROKE.value
+
+        # age band of each time step
+        band_index = self._param.get_band_index(math.ceil(sim_length / delta_t) + 1)
+
+        # indices of the patients who are still alive
+        alive = np.flatnonzero(self._states != death)
+
+        k = 0  # current time step
+        # while some patients are alive and simulation length is not yet reached
+        while alive.size > 0 and k*delta_t < sim_length:
+
+            time_0 = time.perf_counter()
+
+            if self._streams is None:
+                # one uniform per patient (including deceased ones) so that patient i consumes
+                # the same random number at time step k regardless of what happened to other patients
+                u = rng.random_sample(self._initial_pop_size)[alive]
+            else:
+                # the k-th uniform of the stream of each alive patient
+                u = Streams.get_uniforms(keys[alive], k)
+
+            # sample the next state of all alive patients
+            current_states = self._states[alive]
+            new_states = (cum_probs[band_index[k]][current_states] <= u[:, np.newaxis]).sum(axis=1)
+
+            time_1 = time.perf_counter()
+
+            # count strokes
+            self._strokeCounts[alive] += current_states == stroke
+
+            # update survival time of patients who die in this time step
+            # (the 0.5 is a half cycle correction)
+            if_died = new_states == death
+            self._survivalTimes[alive[if_died]] = (k + 0.5) * delta_t
+
+            time_2 = time.perf_counter()
+
+            # update total discounted cost and utility (corrected for the half-cycle effect)
+            discount = self._param.get_discount_factor(k)
+            self._costs[alive] += cost_table[current_states, new_states] * discount
+            self._utilities[alive] += utility_table[current_states, new_states] * discount
+
+            time_3 = time.perf_counter()
+
+            if profiler is not None:
+                profiler.record_cycle(k, alive.size)
+                profiler.record_draws(self._initial_pop_size if self._streams is None else alive.size)
+                profiler.add_time('sampling', time_1 - time_0)
+                profiler.add_time('state_update', time_2 - time_1)
+                profiler.add_time('cost_accrual', time_3 - time_2)
+
+            # update health states
+            self._states[alive] = new_states
+            alive = alive[~if_died]
+
+            # increment time step
+            k += 1
+
+        return self.get_outcomes()
+
+    def get_id(self):
+        return self._id
+
+    def get_parameters(self):
+        return self._param
+
+    def get_streams(self):
+        return self._streams
+
+    def get_initial_pop_size(self):
+        return self._initial_pop_size
+
+    def get_outcomes(self):
+        """ :returns (survival times (nan for patients who are alive), number of strokes, discounted costs,
+        discounted utilities) of the simulated patients """
+        return self._survivalTimes, self._strokeCounts, self._costs, self._utilities
+
+
+def get_prob_matrix(param, k=0):
+    """ :returns the transition probability matrix of the parameter object at time step k as a NumPy array """
+    return np.array([param.get_transition_prob(s, k) for s in param.get_model_states()], dtype=float)
+
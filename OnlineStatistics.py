@@ -0,0 +1,194 @@
+import math as math
+import numpy as np
+import SurvivalCurve as Survival
+import InputData as Data
+
+# summary statistics that are updated one observation at a time, so the observations do not need to be stored
+# (scipy is imported only by the getters that need it)
+
+
+class OnlineSummaryStat:
+    def __init__(self, name, percentiles=None):
+        """ summary statistics of a stream of observations (same getters as scr.StatisticalClasses.SummaryStat)
+        :param name: name of this statistics
+        :param percentiles: percentiles (between 0 and 100) to estimate; by default the median and the
+                            percentiles of the (1-ALPHA) prediction interval
+        """
+        self.name = name
+        self._n = 0             # number of observations
+        self._mean = 0          # running mean
+        self._m2 = 0            # running sum of squared differences from the mean (Welford)
+        self._min = math.inf
+        self._max = -math.inf
+
+        if percentiles is None:
+            percentiles = [50 * Data.ALPHA, 50, 100 - 50 * Data.ALPHA]
+        self._quantiles = {q: P2Quantile(q / 100) for q in percentiles}
+
+    def record(self, obs):
+        """ updates the statistics with a new observation """
+        self._n += 1
+        delta = obs - self._mean
+        self._mean += delta / self._n
+        self._m2 += delta * (obs - self._mean)
+        if obs < self._min:
+            self._min = obs
+        if obs > self._max:
+            self._max = obs
+        for quantile in self._quantiles.values():
+            quantile.record(obs)
+
+    def record_batch(self, obs):
+        """ updates the statistics with a batch of observations (the mean and variance of the batch are
+        merged into the running ones in one step) """
+        obs = np.asarray(obs, dtype=float)
+        if obs.size == 0:
+            return
+        n = self._n + obs.size
+        batch_mean = obs.mean()
+        delta = batch_mean - self._mean
+        self._m2 += ((obs - batch_mean) ** 2).sum() + delta ** 2 * self._n * obs.size / n
+        self._mean += delta * obs.size / n
+        self._n = n
+        self._min = min(self._min, obs.min())
+        self._max = max(self._max, obs.max())
+        for quantile in self._quantiles.values():
+            for x in obs.tolist():
+                quantile.record(x)
+
+    def get_n(self):
+        return self._n
+
+    def get_mean(self):
+        return self._mean
+
+    def get_stdev(self):
+        return math.sqrt(self._m2 / (self._n - 1)) if self._n > 1 else 0
+
+    def get_min(self):
+        return self._min
+
+    def get_max(self):
+        return self._max
+
+    def get_t_half_length(self, alpha):
+        """ :returns the half-length of the t-based (1-alpha) confidence interval of the mean """
+        import scipy.stats as stat
+        return stat.t.ppf(1 - alpha / 2, self._n - 1) * self.get_stdev() / math.sqrt(self._n)
+
+    def get_t_CI(self, alpha):
+        half_length = self.get_t_half_length(alpha)
+        return [self._mean - half_length, self._mean + half_length]
+
+    def get_percentile(self, q):
+        """ :returns the estimated q-th percentile (q must be one of the tracked percentiles) """
+        if q not in self._quantiles:
+            raise ValueError('Percentile {} is not tracked by {}.'.format(q, self.name))
+        return self._quantiles[q].get_value()
+
+    def get_PI(self, alpha):
+        return [self.get_percentile(50 * alpha), self.get_percentile(100 - 50 * alpha)]
+
+
+class P2Quantile:
+    def __init__(self, p):
+        """ estimates a quantile of a stream of observations with the P-square algorithm
+        (Jain and Chlamtac, 1985) using 5 markers
+        :param p: probability of the quantile (between 0 and 1)
+        """
+        self._p = p
+        self._heights = []                              # marker heights
+        self._positions = [0, 1, 2, 3, 4]               # actual marker positions
+        self._desired = [0, 2*p, 4*p, 2 + 2*p, 4]       # desired marker positions
+        self._increments = [0, p/2, p, (1 + p)/2, 1]    # increments of desired positions
+
+    def record(self, obs):
+        """ updates the markers with a new observation """
+
+        q = self._heights
+        # the first 5 observations initialize the markers
+        if len(q) < 5:
+            q.append(obs)
+            q.sort()
+            return
+
+        n = self._positions
+        # find the cell of the new observation and adjust the extreme markers
+        if obs < q[0]:
+            q[0] = obs
+            k = 0
+        elif obs >= q[4]:
+            q[4] = obs
+            k = 3
+        else:
+            k = 0
+            while obs >= q[k + 1]:
+                k += 1
+
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self._desired[i] += self._increments[i]
+
+        # adjust the heights of the middle markers
+        for i in range(1, 4):
+            d = self._desired[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                # piecewise parabolic prediction
+                height = q[i] + d / (n[i + 1] - n[i - 1]) * (
+                    (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i]) +
+                    (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1]))
+                if not q[i - 1] < height < q[i + 1]:
+                    # linear prediction
+                    height = q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+                q[i] = height
+                n[i] += d
+
+    def get_value(self):
+        """ :returns the estimated quantile """
+        if len(self._heights) == 0:
+            return None
+        if len(self._heights) < 5:
+            return np.percentile(self._heights, 100 * self._p)
+        return self._heights[2]
+
+
+class SurvivalHistogram:
+    def __init__(self, name, initial_size, bin_width=None):
+        """ counts the number of deaths in each time bin of width bin_width
+        :param name: name of the survival curve
+        :param initial_size: population size at time 0
+        :param bin_width: width of time bins (Data.DELTA_T if not provided)
+        """
+        self.name = name
+        self._initialSize = initial_size
+        self._binWidth = Data.DELTA_T if bin_width is None else bin_width
+        self._deathCounts = {}     # number of deaths in each bin
+
+    def record(self, survival_time):
+        """ records the death of a patient at the specified time """
+        i = int(survival_time // self._binWidth)
+        self._deathCounts[i] = self._deathCounts.get(i, 0) + 1
+
+    def record_batch(self, survival_times):
+        """ records the deaths of a batch of patients (bins are counted in one step) """
+        bins, counts = np.unique(np.floor_divide(np.asarray(survival_times, dtype=float), self._binWidth),
+                                 return_counts=True)
+        for i, count in zip(bins.astype(int).tolist(), counts.tolist()):
+            self._deathCounts[i] = self._deathCounts.get(i, 0) + count
+
+    def get_death_counts(self):
+        """ :returns (start time of bins, number of deaths in each bin) """
+        bins = sorted(self._deathCounts)
+        return [i * self._binWidth for i in bins], [self._deathCounts[i] for i in bins]
+
+    def get_survival_curve(self):
+        """ :returns the survival curve (SurvivalCurve.SurvivalCurve; deaths are placed at the middle of
+        their bin) """
+        bins = sorted(self._deathCounts)
+        counts = [self._deathCounts[i] for i in bins]
+        # patients who are alive have no survival time
+        return Survival.SurvivalCurve(
+            self.name, 0, [(i + 0.5) * self._binWidth for i in bins] + [np.nan],
+            counts=counts + [self._initialSize - sum(counts)])
@@ -0,0 +1,238 @@
+import json
+import os
+import shutil
+import numpy as np
+import OnlineStatistics as OnlineStat
+import ParameterClasses as P
+import InputData as Data
+
+# columnar store of per-patient outcomes: every outcome is saved as its own .npy file in a directory, next to
+# a JSON file of cohort metadata. Columns are reloaded as read-only memory maps, so the outcomes of a very
+# large cohort can be opened instantly and summarized chunk by chunk without reading them into memory.
+# The metadata file is written last and marks a complete store; it records the therapy, cohort id and time
+# step of the cohort, so a store can be summarized without the parameters it was simulated with.
+
+# version of the store format (saved in the metadata)
+STORE_FORMAT = 1
+METADATA_FILE = 'metadata.json'
+
+# columns of the store and their data types
+COLUMNS = ['survival_times', 'count_strokes', 'costs', 'utilities']
+DTYPES = {
+    'survival_times': np.float64,   # nan for patients who are alive at the end of simulation
+    'count_strokes': np.int32,
+    'costs': np.float64,
+    'utilities': np.float64
+}
+
+
+class OutcomeWriter:
+    def __init__(self, directory, n_patients, metadata=None):
+        """ writes the outcomes of patients to a new store batch by batch, so the outcomes of a cohort never
+        need to be in memory all at once
+        :param directory: directory of the store (replaced if it already exists)
+        :param n_patients: number of patients that will be written
+        :param metadata: dictionary of cohort metadata to save (must be JSON serializable),
+                         for example {'therapy': 'NONE', 'cohort_id': 0, 'delta_t': 1}
+        """
+        self._directory = directory
+        self._nPatients = n_patients
+        self._metadata = {} if metadata is None else dict(metadata)
+        self._nWritten = 0
+
+        # columns are written to a temporary directory that replaces the store when it is complete
+        self._tempDirectory = directory.rstrip(os.sep) + '.tmp'
+        if os.path.exists(self._tempDirectory):
+            shutil.rmtree(self._tempDirectory)
+        os.makedirs(self._tempDirectory)
+        self._columns = {name: np.lib.format.open_memmap(
+            os.path.join(self._tempDirectory, name + '.npy'), mode='w+', dtype=DTYPES[name], shape=(n_patients,))
+            for name in COLUMNS}
+
+    def write(self, survival_times, count_strokes, costs, utilities):
+        """ appends the outcomes of a batch of patients (survival times are None or nan for patients who are
+        alive) """
+        batch = dict(zip(COLUMNS, (survival_times, count_strokes, costs, utilities)))
+        n = len(costs)
+        if self._nWritten + n > self._nPatients:
+            raise ValueError('The store was created for {} patients.'.format(self._nPatients))
+        for name in COLUMNS:
+            self._columns[name][self._nWritten:self._nWritten + n] = np.asarray(batch[name], dtype=DTYPES[name])
+        self._nWritten += n
+
+    def close(self):
+        """ completes the store (all patients must have been written) """
+        if self._nWritten != self._nPatients:
+            raise ValueError('{} of {} patients were written.'.format(self._nWritten, self._nPatients))
+
+        for column in self._columns.values():
+            column.flush()
+        self._columns = {}
+
+        metadata = dict(self._metadata)
+        metadata.update({
+            'format': STORE_FORMAT,
+            'n_patients': self._nPatients,
+            'initial_pop_size': self._metadata.get('initial_pop_size', self._nPatients),
+            'columns': {name: np.dtype(DTYPES[name]).str for name in COLUMNS}
+        })
+        with open(os.path.join(self._tempDirectory, METADATA_FILE), 'w') as metadata_file:
+            json.dump(metadata, metadata_file, indent=2)
+
+        if os.path.exists(self._directory):
+            shutil.rmtree(self._directory)
+        os.replace(self._tempDirectory, self._directory)
+
+
+def save_cohort(cohort, directory, metadata=None):
+    """ saves the outcomes of a simulated cohort to a store
+    :param cohort: a cohort after being simulated (any object with get_outcomes and get_initial_pop_size,
+                   for example MarkovModelVectorized.Cohort or a cohort loaded with load_cohort); the therapy,
+                   cohort id and time step are saved from the cohort's get_parameters and get_id (or from the
+                   metadata of a loaded cohort)
+    :param directory: directory of the store (replaced if it already exists)
+    :param metadata: dictionary of additional cohort metadata to save (must be JSON serializable)
+    """
+    outcomes = cohort.get_outcomes()
+    metadata = {} if metadata is None else dict(metadata)
+    if isinstance(cohort, StoredCohort):
+        metadata.update({key: cohort.get_metadata()[key] for key in ['therapy', 'cohort_id', 'delta_t']
+                         if key in cohort.get_metadata()})
+    if hasattr(cohort, 'get_parameters'):
+        param = cohort.get_parameters()
+        metadata['therapy'] = param.get_therapy().name
+        metadata['delta_t'] = param.get_delta_t()
+    if hasattr(cohort, 'get_id'):
+        metadata['cohort_id'] = cohort.get_id()
+    metadata['initial_pop_size'] = cohort.get_initial_pop_size()
+
+    writer = OutcomeWriter(directory, len(outcomes[2]), metadata)
+    writer.write(*outcomes)
+    writer.close()
+
+
+def load_cohort(directory, mmap=True):
+    """ :returns the cohort saved in a store (can be passed to MarkovModel.CohortOutputs, or to
+    CohortOutputsStored to summarize it without reading it into memory)
+    :param directory: directory of the store
+    :param mmap: if True, columns are opened as read-only memory maps; otherwise they are read into memory
+    """
+
+    with open(os.path.join(directory, METADATA_FILE)) as metadata_file:
+        metadata = json.load(metadata_file)
+    if metadata['format'] != STORE_FORMAT:
+        raise ValueError('Store format {} is not supported (expected {}).'.format(metadata['format'], STORE_FORMAT))
+
+    columns = [np.load(os.path.join(directory, name + '.npy'), mmap_mode='r' if mmap else None)
+               for name in COLUMNS]
+    return StoredCohort(tuple(columns), metadata)
+
+
+class StoredCohort:
+    def __init__(self, outcomes, metadata):
+        """ outcomes of a cohort loaded from a store
+        :param outcomes: (survival times (nan for patients who are alive), number of strokes, discounted costs,
+                         discounted utilities) as NumPy arrays (or memory maps)
+        :param metadata: dictionary of cohort metadata
+        """
+        self._outcomes = outcomes
+        self._metadata = metadata
+
+    def get_initial_pop_size(self):
+        return self._metadata['initial_pop_size']
+
+    def get_therapy(self):
+        """ :returns the therapy of the cohort (None if it was not saved) """
+        if 'therapy' not in self._metadata:
+            return None
+        return P.Therapies[self._metadata['therapy']]
+
+    def get_id(self):
+        """ :returns the id of the cohort (None if it was not saved) """
+        return self._metadata.get('cohort_id')
+
+    def get_delta_t(self):
+        """ :returns the time step of the cohort (None if it was not saved) """
+        return self._metadata.get('delta_t')
+
+    def get_metadata(self):
+        return self._metadata
+
+    def get_outcomes(self):
+        return self._outcomes
+
+    def iterate_chunks(self, chunk_size=10**6):
+        """ :returns a generator of the outcomes of consecutive chunks of patients
+        (only one chunk of each column is read from disk at a time) """
+        n = len(self._outcomes[2])
+        for start in range(0, n, chunk_size):
+            yield tuple(np.asarray(column[start:start + chunk_size]) for column in self._outcomes)
+
+
+class CohortOutputsStored:
+    def __init__(self, stored_cohort, chunk_size=10**6, bin_width=None):
+        """ summarizes a stored cohort chunk by chunk (same summary statistics, survival curve and outcome
+        getters as MarkovModel.CohortOutputs, but percentiles are not estimated and the per-patient outcomes
+        are returned as the memory maps of the store)
+        :param stored_cohort: cohort loaded with load_cohort
+        :param chunk_size: number of patients read from disk at a time
+        :param bin_width: width of the time bins of the survival curve (the time step of the cohort; Data.DELTA_T
+                          for stores saved without it)
+        """
+
+        self._cohort = stored_cohort
+        if bin_width is None:
+            bin_width = stored_cohort.get_delta_t()
+        if bin_width is None:
+            bin_width = Data.DELTA_T
+
+        self._sumStat_survivalTime = OnlineStat.OnlineSummaryStat('Patient survival time', percentiles=[])
+        self._sumState_number_strokes = OnlineStat.OnlineSummaryStat('Time until stroke', percentiles=[])
+        self._sumStat_cost = OnlineStat.OnlineSummaryStat('Patient discounted cost', percentiles=[])
+        self._sumStat_utility = OnlineStat.OnlineSummaryStat('Patient discounted utility', percentiles=[])
+        self._survivalHistogram = OnlineStat.SurvivalHistogram(
+            'Population size over time', stored_cohort.get_initial_pop_size(), bin_width)
+
+        for survival_times, count_strokes, costs, utilities in stored_cohort.iterate_chunks(chunk_size):
+            # survival time is only recorded for patients who have died
+            survival_times = survival_times[~np.isnan(survival_times)]
+            self._sumStat_survivalTime.record_batch(survival_times)
+            self._survivalHistogram.record_batch(survival_times)
+            self._sumState_number_strokes.record_batch(count_strokes)
+            self._sumStat_cost.record_batch(costs)
+            self._sumStat_utility.record_batch(utilities)
+
+    def get_if_developed_stroke(self):
+        return self._cohort.get_outcomes()[1]
+
+    def get_survival_times(self):
+        """ :returns survival times of patients who have died (read into memory) """
+        survival_times = self._cohort.get_outcomes()[0]
+        return survival_times[~np.isnan(survival_times)]
+
+    def get_survival_times_by_patient(self):
+        return self._cohort.get_outcomes()[0]
+
+    def get_costs(self):
+        return self._cohort.get_outcomes()[2]
+
+    def get_utilities(self):
+        return self._cohort.get_outcomes()[3]
+
+    def get_sumStat_survival_times(self):
+        return self._sumStat_survivalTime
+
+    def get_sumStat_discounted_cost(self):
+        return self._sumStat_cost
+
+    def get_sumStat_discounted_utility(self):
+        return self._sumStat_utility
+
+    def get_sumStat_count_strokes(self):
+        return self._sumState_number_strokes
+
+    def get_survival_histogram(self):
+        return self._survivalHistogram
+
+    def get_survival_curve(self):
+        return self._survivalHistogram.get_survival_curve()
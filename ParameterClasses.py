@@ -1,12 +1,12 @@
 from enum import Enum
+import bisect
 import numpy as np
-import scipy.stats as stat
 import math as math
 import InputData as Data
-import scr.MarkovClasses as MarkovCls
 import scr.RandomVariantGenerators as Random
-import scr.ProbDistParEst as Est
 
+# scipy is imported where it is used (probabilistic sensitivity analysis and time step conversion), so that
+# processes which only simulate with the default time step do not pay for importing it
 
 
 class HealthStats(Enum):
@@ -23,17 +23,88 @@ class Therapies(Enum):
     ANTICOAG = 1
 
 
-class ParametersFixed():
-    def __init__(self, therapy):
+class TunnelState:
+    """ a later time step spent in a tunnel health state (a state that is left after exactly
+    TRANS_MATRIX_TIME_STEP, such as STROKE) when the simulation time step is shorter; patients move through
+    the tunnel states of a health state one time step at a time """
+    __slots__ = ('value', 'name', '_healthState')
+
+    def __init__(self, value, health_state, step):
+        """
+        :param value: index of this state in the transition probability matrices
+        :param health_state: the tunnel health state
+        :param step: time step of the tunnel this state represents (1, 2, ...; step 0 is the health state itself)
+        """
+        self.value = value
+        self.name = '{}_{}'.format(health_state.name, step)
+        self._healthState = health_state
+
+    def get_health_state(self):
+        return self._healthState
+
+
+class CumulativeEmpirical:
+    """ empirical distribution over {0, 1, 2, ...} that samples by searching the precomputed cumulative
+    probabilities; for the same random number generator it returns the same outcomes as
+    scr.RandomVariantGenerators.Empirical without rebuilding the distribution on every draw """
+
+    def __init__(self, probabilities):
+        """
+        :param probabilities: probabilities of outcomes 0, 1, 2, ...
+        """
+        cum_prob = np.cumsum(np.array(probabilities, dtype=float))
+        cum_prob /= cum_prob[-1]
+        self._cumProb = cum_prob.tolist()
+
+    def sample(self, rng):
+        """ :returns an outcome from {0, 1, 2, ...}
+        :param rng: random number generator """
+        return bisect.bisect_right(self._cumProb, rng.random_sample())
+
+    def get_cum_prob(self):
+        return self._cumProb
+
+
+class ModelInputs:
+    """ model inputs of InputData with some of them replaced by other values; InputData itself is not modified,
+    so parameters of many scenarios can be built in the same process. Inputs are read as attributes,
+    for example ModelInputs({'RR_STROKE': 0.5}).RR_STROKE """
+
+    def __init__(self, overrides=None):
+        """
+        :param overrides: dictionary of new values of InputData constants, for example {'DISCOUNT': 0.05}
+        """
+        self._overrides = {} if overrides is None else dict(overrides)
+        for name in self._overrides:
+            if not hasattr(Data, name):
+                raise ValueError('Unknown model input {}.'.format(name))
+
+    def __getattr__(self, name):
+        # only called for the names of model inputs (attributes of this object are found before)
+        if name.startswith('_'):
+            raise AttributeError(name)
+        if name in self._overrides:
+            return self._overrides[name]
+        return getattr(Data, name)
+
+    def get_overrides(self):
+        return dict(self._overrides)
+
+
+class _Parameters:
+    def __init__(self, therapy, inputs=Data):
 
         # selected therapy
         self._therapy = therapy
 
+        # model inputs (InputData or ModelInputs)
+        self._inputs = inputs
+
         # simulation time step
-        self._delta_t = Data.DELTA_T
+        self._delta_t = inputs.DELTA_T
 
         # calculate the adjusted discount rate
-        self._adjDiscountRate = Data.DISCOUNT*Data.DELTA_T
+        self._adjDiscountRate = inputs.DISCOUNT*inputs.DELTA_T
 
         # initial health state
         self._initialHealthState = HealthStats.WELL
@@ -42,22 +113,101 @@ class ParametersFixed():
         if self._therapy == Therapies.NONE:
             self._annualTreatmentCost = 0
         else:
-            self._annualTreatmentCost = Data.ANTICOAGULANT_COST
+            self._annualTreatmentCost = inputs.ANTICOAGULANT_COST
 
-        # transition probability matrix of the selected therapy
-        self._prob_matrix = []
-        # treatment relative risk
-        self._treatmentRR = 0
+        # health states followed by the tunnel states (see TunnelState), indexed as the rows of the transition
+        # probability matrices
+        self._modelStates = list(HealthStats)
+        # transition probability matrix of the selected therapy in each age band
+        self._probMatrices = []
+        # one sampler per age band and model state to sample the next state from
+        self._transitionSamplers = []
 
-        # calculate transition probabilities depending of which therapy options is in use
-        if therapy == Therapies.NONE:
-            self._prob_matrix = Data.TRANS_MATRIX
+        # annual state costs and utilities
+        self._annualStateCosts = []
+        self._annualStateUtilities = []
+        # cost and utility of each (current state, next state) transition
+        self._transitionCosts = []
+        self._transitionUtilities = []
+
+        # discount factor of each time step of the simulation (corrected for the half-cycle effect)
+        self._discountFactors = [self._calculate_discount_factor(k)
+                                 for k in range(math.ceil(inputs.SIM_LENGTH / self._delta_t))]
+
+        # age band of each time step of the simulation (always 0 if mortality is not age-dependent)
+        self._bandAges = [age for age, mortality in get_background_mortality_bands(inputs)]
+        self._bandIndex = [self._calculate_band(k) for k in range(math.ceil(inputs.SIM_LENGTH / self._delta_t))]
+
+    def _set_prob_matrices(self, prob_matrix, prob_matrices):
+        """ sets the transition probability matrix (over one time step) of each age band and precomputes
+        the samplers of the next state
+        :param prob_matrix: transition probability matrix over a time step of TRANS_MATRIX_TIME_STEP
+        :param prob_matrices: transition probability matrices of the age bands (see calculate_band_prob_matrices)
+        """
+        self._modelStates = get_model_states(prob_matrix, self._delta_t, self._inputs.TRANS_MATRIX_TIME_STEP)
+        self._probMatrices = prob_matrices
+        self._transitionSamplers = [[CumulativeEmpirical(row) for row in prob_matrix]
+                                    for prob_matrix in self._probMatrices]
+
+    def _set_state_payoffs(self, annual_state_costs, annual_state_utilities):
+        """ sets the annual state costs and utilities and precomputes the payoff of every transition """
+        self._annualStateCosts = annual_state_costs
+        self._annualStateUtilities = annual_state_utilities
+
+        self._transitionCosts = []
+        self._transitionUtilities = []
+        for current_state in self._modelStates:
+            costs = []
+            utilities = []
+            for next_state in self._modelStates:
+                cost, utility = self._calculate_transition_cost_utility(current_state, next_state)
+                costs.append(cost)
+                utilities.append(utility)
+            self._transitionCosts.append(costs)
+            self._transitionUtilities.append(utilities)
+
+    def _calculate_transition_cost_utility(self, current_state, next_state):
+        """ :returns (cost, utility) accrued over one time step when moving from current_state to next_state
+        (not yet discounted) """
+
+        # update cost
+        cost = 0.5 * (self.get_annual_state_cost(current_state) +
+                      self.get_annual_state_cost(next_state)) * self.get_delta_t()
+        # update utility
+        utility = 0.5 * (self.get_annual_state_utility(current_state) +
+                         self.get_annual_state_utility(next_state)) * self.get_delta_t()
+
+        # tunnel states are charged as their health state
+        current_state = get_health_state(current_state)
+        next_state = get_health_state(next_state)
+
+        # add the cost of treatment
+        # if death will occur
+        if next_state == HealthStats.DEATH:
+            cost += 0.5 * self.get_annual_treatment_cost() * self.get_delta_t()
+        elif current_state == HealthStats.STROKE:
+            cost += 0
+        elif current_state == HealthStats.WELL:
+            cost += 0
         else:
-            self._prob_matrix = calculate_prob_matrix_anticoag()
+            cost += 1 * self.get_annual_treatment_cost() * self.get_delta_t()
 
-        # annual state costs and utilities
-        self._annualStateCosts = Data.ANNUAL_STATE_COST
-        self._annualStateUtilities = Data.ANNUAL_STATE_UTILITY
+        return cost, utility
+
+    def _calculate_band(self, k):
+        """ :returns the age band of time step k """
+        return max(bisect.bisect_right(self._bandAges, self._inputs.INITIAL_AGE + k * self._delta_t) - 1, 0)
+
+    def _calculate_discount_factor(self, k):
+        """ :returns the discount factor of time step k (corrected for the half-cycle effect) """
+        return pow(1 + self._adjDiscountRate / 2, -(2*k + 1))
+
+    def get_therapy(self):
+        return self._therapy
+
+    def get_inputs(self):
+        """ :returns the model inputs of these parameters (InputData or ModelInputs) """
+        return self._inputs
 
     def get_initial_health_state(self):
         return self._initialHealthState
@@ -68,16 +218,59 @@ class ParametersFixed():
     def get_adj_discount_rate(self):
         return self._adjDiscountRate
 
-    def get_transition_prob(self, state):
-        return self._prob_matrix[state.value]
+    def get_model_states(self):
+        """ :returns the health states followed by the tunnel states (indexed as the rows of the transition
+        probability matrices) """
+        return self._modelStates
+
+    def get_model_state(self, index):
+        """ :returns the model state (health state or tunnel state) with the index """
+        return self._modelStates[index]
+
+    def get_health_state_index(self):
+        """ :returns the index of the health state of each model state as a NumPy array """
+        return np.array([get_health_state(s).value for s in self._modelStates], dtype=np.intp)
+
+    def get_n_bands(self):
+        return len(self._probMatrices)
+
+    def get_band(self, k):
+        """ :returns the age band of time step k """
+        if k < len(self._bandIndex):
+            return self._bandIndex[k]
+        return self._calculate_band(k)
+
+    def get_band_index(self, n_time_steps):
+        """ :returns the age band of time steps 0, 1, ..., n_time_steps-1 as a NumPy array """
+        return np.array([self.get_band(k) for k in range(n_time_steps)], dtype=np.intp)
+
+    def get_transition_prob(self, state, k=0):
+        """ :returns the probabilities of moving from state to each health state at time step k """
+        return self._probMatrices[self.get_band(k)][state.value]
+
+    def get_transition_sampler(self, state, k=0):
+        """ :returns the sampler of the next state when in state at time step k """
+        return self._transitionSamplers[self.get_band(k)][state.value]
+
+    def get_prob_matrices(self):
+        """ :returns the transition probability matrix of each age band as a NumPy array
+        (bands x states x states) """
+        return np.array(self._probMatrices, dtype=float)
+
+    def get_cum_prob_matrices(self):
+        """ :returns the cumulative transition probabilities of each age band as a NumPy array
+        (bands x states x states) """
+        return np.array([[sampler.get_cum_prob() for sampler in samplers] for samplers in self._transitionSamplers])
 
     def get_annual_state_cost(self, state):
+        state = get_health_state(state)
         if state == HealthStats.DEATH:
             return 0
         else:
             return self._annualStateCosts[state.value]
 
     def get_annual_state_utility(self, state):
+        state = get_health_state(state)
         if state == HealthStats.DEATH:
             return 0
         else:
@@ -86,10 +279,181 @@ class ParametersFixed():
     def get_annual_treatment_cost(self):
         return self._annualTreatmentCost
 
+    def get_transition_cost(self, current_state, next_state):
+        """ :returns the (not discounted) cost of moving from current_state to next_state in one time step """
+        return self._transitionCosts[current_state.value][next_state.value]
+
+    def get_transition_utility(self, current_state, next_state):
+        """ :returns the (not discounted) utility of moving from current_state to next_state in one time step """
+        return self._transitionUtilities[current_state.value][next_state.value]
+
+    def get_transition_cost_matrix(self):
+        """ :returns the cost of each (current state, next state) transition as a NumPy array """
+        return np.array(self._transitionCosts, dtype=float)
+
+    def get_transition_utility_matrix(self):
+        """ :returns the utility of each (current state, next state) transition as a NumPy array """
+        return np.array(self._transitionUtilities, dtype=float)
+
+    def get_discount_factor(self, k):
+        """ :returns the discount factor of time step k (corrected for the half-cycle effect) """
+        if k < len(self._discountFactors):
+            return self._discountFactors[k]
+        return self._calculate_discount_factor(k)
+
+    def get_discount_factors(self, n_time_steps):
+        """ :returns the discount factors of time steps 0, 1, ..., n_time_steps-1 as a NumPy array """
+        return np.array([self.get_discount_factor(k) for k in range(n_time_steps)])
+
+
+# transition probability matrices of the fixed parameters keyed by the therapy, time step, age bands and the
+# inputs of the transition probabilities, so the matrix exponentials are calculated once per process
+_fixedProbMatrices = {}
+
+
+class ParametersFixed(_Parameters):
+    def __init__(self, therapy, overrides=None):
+        """
+        :param therapy: selected therapy
+        :param overrides: dictionary of values that replace the InputData constants of the same names for these
+                          parameters only, for example {'RR_STROKE': 0.5} (see ModelInputs)
+        """
+
+        inputs = Data if not overrides else ModelInputs(overrides)
+        _Parameters.__init__(self, therapy, inputs)
+
+        # calculate transition probabilities depending of which therapy options is in use
+        # (in each age band, converted to the simulation time step)
+        if therapy == Therapies.NONE:
+            prob_matrix = inputs.TRANS_MATRIX
+        else:
+            prob_matrix = calculate_prob_matrix_anticoag(inputs.TRANS_MATRIX, inputs.RR_STROKE, inputs.RR_BLEEDING)
+        key = (therapy, self._delta_t, tuple(get_background_mortality_bands(inputs)),
+               repr(inputs.TRANS_MATRIX), inputs.TRANS_MATRIX_TIME_STEP, inputs.RR_STROKE, inputs.RR_BLEEDING)
+        if key not in _fixedProbMatrices:
+            _fixedProbMatrices[key] = calculate_band_prob_matrices(prob_matrix, self._delta_t, inputs)
+        self._set_prob_matrices(prob_matrix, _fixedProbMatrices[key])
+
+        # annual state costs and utilities
+        self._set_state_payoffs(inputs.ANNUAL_STATE_COST, inputs.ANNUAL_STATE_UTILITY)
+
+
+class ParametersProbabilistic(_Parameters):
+    def __init__(self, therapy, prob_matrix, annual_state_costs, annual_state_utilities, rr_stroke, rr_bleeding):
+        """ one set of parameters sampled for probabilistic sensitivity analysis
+        :param therapy: selected therapy
+        :param prob_matrix: transition probability matrix of the selected therapy
+                            (over a time step of Data.TRANS_MATRIX_TIME_STEP)
+        :param annual_state_costs: annual cost of each health state
+        :param annual_state_utilities: annual health utility of each health state
+        :param rr_stroke: sampled relative risk of stroke under anticoagulation
+        :param rr_bleeding: sampled relative risk of death due to bleeding under anticoagulation
+        """
+
+        _Parameters.__init__(self, therapy)
+
+        self._set_prob_matrices(prob_matrix, calculate_band_prob_matrices(prob_matrix, self._delta_t))
+        self._set_state_payoffs(annual_state_costs, annual_state_utilities)
+        self._rrStroke = rr_stroke
+        self._rrBleeding = rr_bleeding
+
+    def get_rr_stroke(self):
+        return self._rrStroke
+
+    def get_rr_bleeding(self):
+        return self._rrBleeding
+
+
+class ParameterSetSampler:
+    def __init__(self, n_sets, seed):
+        """ samples all parameter sets for probabilistic sensitivity analysis at once
+        :param n_sets: number of parameter sets to sample
+        :param seed: seed of the random number generator
+        """
+
+        self._nSets = n_sets
+        rng = Random.RNG(seed)
+        n_states = len(HealthStats)
+
+        # transition probabilities without therapy: each row follows a Dirichlet distribution over
+        # its non-zero probabilities (rows with a single non-zero probability are fixed)
+        self._probMatrices = np.tile(np.array(Data.TRANS_MATRIX, dtype=float), (n_sets, 1, 1))
+        for s in HealthStats:
+            row = np.array(Data.TRANS_MATRIX[s.value], dtype=float)
+            non_zero = np.flatnonzero(row)
+            if len(non_zero) > 1:
+                self._probMatrices[:, s.value, non_zero] = rng.dirichlet(
+                    row[non_zero] * Data.TRANS_MATRIX_SAMPLE_SIZE, size=n_sets)
+
+        # relative risks follow log-normal distributions fitted to their 95% confidence intervals
+        import scipy.stats as stat
+        z = stat.norm.ppf(0.975)
+        self._rrStroke = rng.lognormal(
+            mean=math.log(Data.RR_STROKE),
+            sigma=(math.log(Data.RR_STROKE_CI[1]) - math.log(Data.RR_STROKE_CI[0])) / (2 * z),
+            size=n_sets)
+        self._rrBleeding = rng.lognormal(
+            mean=math.log(Data.RR_BLEEDING),
+            sigma=(math.log(Data.RR_BLEEDING_CI[1]) - math.log(Data.RR_BLEEDING_CI[0])) / (2 * z),
+            size=n_sets)
+
+        # annual state costs follow gamma distributions (zero costs are fixed)
+        self._annualStateCosts = np.zeros((n_sets, n_states))
+        for s in HealthStats:
+            mean = Data.ANNUAL_STATE_COST[s.value]
+            if mean > 0:
+                st_dev = Data.ANNUAL_STATE_COST_CV * mean
+                self._annualStateCosts[:, s.value] = rng.gamma(
+                    shape=(mean / st_dev) ** 2, scale=st_dev ** 2 / mean, size=n_sets)
 
+        # annual state utilities follow beta distributions (utilities of 0 and 1 are fixed)
+        self._annualStateUtilities = np.tile(np.array(Data.ANNUAL_STATE_UTILITY, dtype=float), (n_sets, 1))
+        for s in HealthStats:
+            mean = Data.ANNUAL_STATE_UTILITY[s.value]
+            if 0 < mean < 1:
+                common = mean * (1 - mean) / Data.ANNUAL_STATE_UTILITY_SD ** 2 - 1
+                self._annualStateUtilities[:, s.value] = rng.beta(
+                    a=mean * common, b=(1 - mean) * common, size=n_sets)
 
-def calculate_prob_matrix_anticoag():
-    """ :returns transition probability matrix under anticoagulation use"""
+        # transition probabilities under anticoagulation (calculated once per parameter set)
+        self._probMatricesAnticoag = [
+            calculate_prob_matrix_anticoag(self._probMatrices[i].tolist(), self._rrStroke[i], self._rrBleeding[i])
+            for i in range(n_sets)]
+
+    def get_n_sets(self):
+        return self._nSets
+
+    def get_parameters(self, i, therapy):
+        """ :returns the i-th parameter set under the selected therapy """
+
+        if therapy == Therapies.NONE:
+            prob_matrix = self._probMatrices[i].tolist()
+        else:
+            prob_matrix = self._probMatricesAnticoag[i]
+
+        return ParametersProbabilistic(
+            therapy=therapy,
+            prob_matrix=prob_matrix,
+            annual_state_costs=self._annualStateCosts[i].tolist(),
+            annual_state_utilities=self._annualStateUtilities[i].tolist(),
+            rr_stroke=self._rrStroke[i],
+            rr_bleeding=self._rrBleeding[i])
+
+
+def calculate_prob_matrix_anticoag(trans_matrix=None, rr_stroke=None, rr_bleeding=None):
+    """ :returns transition probability matrix under anticoagulation use
+    :param trans_matrix: transition probability matrix without therapy (Data.TRANS_MATRIX if not provided)
+    :param rr_stroke: relative risk of stroke under anticoagulation (Data.RR_STROKE if not provided)
+    :param rr_bleeding: relative risk of death due to bleeding under anticoagulation
+                        (Data.RR_BLEEDING if not provided)
+    """
+
+    if trans_matrix is None:
+        trans_matrix = Data.TRANS_MATRIX
+    if rr_stroke is None:
+        rr_stroke = Data.RR_STROKE
+    if rr_bleeding is None:
+        rr_bleeding = Data.RR_BLEEDING
 
     # create an empty matrix populated with zeroes
     prob_matrix = []
@@ -102,14 +466,172 @@ def calculate_prob_matrix_anticoag():
         if s == HealthStats.POST_STROKE:
             # post-stoke to stroke
             prob_matrix[s.value][HealthStats.STROKE.value]\
-                = Data.RR_STROKE*Data.TRANS_MATRIX[s.value][HealthStats.STROKE.value]
+                = rr_stroke*trans_matrix[s.value][HealthStats.STROKE.value]
             # post-stroke to death
             prob_matrix[s.value][HealthStats.DEATH.value] \
-                = Data.RR_STROKE * Data .RR_BLEEDING * Data.TRANS_MATRIX[s.value][HealthStats.DEATH.value]
+                = rr_stroke * rr_bleeding * trans_matrix[s.value][HealthStats.DEATH.value]
             # staying in post-stroke
             prob_matrix[s.value][s.value]\
                 = 1 -prob_matrix[s.value][HealthStats.STROKE.value] -prob_matrix[s.value][HealthStats.DEATH.value]
         else:
-            prob_matrix[s.value] = Data.TRANS_MATRIX[s.value]
+            prob_matrix[s.value] = trans_matrix[s.value]
 
     return prob_matrix
+
+
+def get_rate_matrix(prob_matrix):
+    """ :returns the rate (generator) matrix Q of a transition probability matrix P, so that expm(Q) is
+    the transition probability matrix over the time step of P; the rows of tunnel states (states that are
+    always left after one time step) are zero and must be kept from P
+    :param prob_matrix: transition probability matrix
+    """
+
+    import scipy.linalg as linalg
+
+    prob_matrix = np.array(prob_matrix, dtype=float)
+    n_states = len(prob_matrix)
+    prob_stay = prob_matrix.diagonal()
+    if_tunnel = prob_stay == 0
+
+    # the matrix logarithm of P is the generator if it is real with non-negative off-diagonal rates
+    if not if_tunnel.any():
+        rate_matrix = linalg.logm(prob_matrix)
+        if np.allclose(rate_matrix.imag, 0):
+            rate_matrix = rate_matrix.real
+            off_diagonal = rate_matrix[~np.identity(n_states, dtype=bool)]
+            if off_diagonal.min() >= -1e-12:
+                return rate_matrix
+
+    # otherwise each state is left with a constant hazard, -log(probability of staying), split among the
+    # next states in proportion to their probabilities (this reproduces P when the next states of every state
+    # are absorbing or tunnel states over one time step, as in this model)
+    rate_matrix = np.zeros((n_states, n_states))
+    for i in range(n_states):
+        if 0 < prob_stay[i] < 1:
+            hazard = -math.log(prob_stay[i])
+            rate_matrix[i] = hazard * prob_matrix[i] / (1 - prob_stay[i])
+            rate_matrix[i, i] = -hazard
+    return rate_matrix
+
+
+def get_health_state(state):
+    """ :returns the health state of a model state (the health state of a tunnel state) """
+    if isinstance(state, TunnelState):
+        return state.get_health_state()
+    return state
+
+
+def get_n_tunnel_steps(delta_t, time_step=None):
+    """ :returns the number of time steps of length delta_t spent in a tunnel health state, which lasts
+    time_step (Data.TRANS_MATRIX_TIME_STEP if not provided) """
+    if time_step is None:
+        time_step = Data.TRANS_MATRIX_TIME_STEP
+    return max(int(round(time_step / delta_t)), 1)
+
+
+def get_model_states(prob_matrix, delta_t, time_step=None):
+    """ :returns the health states followed by the tunnel states of every tunnel health state (a state with
+    zero probability of staying, which is left after exactly time_step) when the time step delta_t is shorter
+    than time_step
+    :param prob_matrix: transition probability matrix over a time step of length time_step
+    :param delta_t: length of the simulation time step
+    :param time_step: time step of prob_matrix (Data.TRANS_MATRIX_TIME_STEP if not provided)
+    """
+    states = list(HealthStats)
+    n_steps = get_n_tunnel_steps(delta_t, time_step)
+    for s in HealthStats:
+        if prob_matrix[s.value][s.value] == 0:
+            for step in range(1, n_steps):
+                states.append(TunnelState(len(states), s, step))
+    return states
+
+
+def convert_prob_matrix(prob_matrix, delta_t, time_step=None):
+    """ :returns the transition probability matrix over a time step of length delta_t; tunnel health states
+    still last time_step, so when delta_t is shorter their patients move through tunnel states (see
+    get_model_states) and the matrix has one row and column per model state
+    :param prob_matrix: transition probability matrix over a time step of length time_step
+    :param delta_t: length of the new time step
+    :param time_step: time step of prob_matrix (Data.TRANS_MATRIX_TIME_STEP if not provided)
+    """
+
+    if time_step is None:
+        time_step = Data.TRANS_MATRIX_TIME_STEP
+
+    # no conversion needed
+    if delta_t == time_step:
+        return prob_matrix
+
+    import scipy.linalg as linalg
+
+    rate_matrix = get_rate_matrix(prob_matrix)
+    converted = linalg.expm(rate_matrix * delta_t / time_step)
+
+    # remove the round-off errors of the matrix exponential
+    converted = np.clip(converted, 0, 1)
+    converted /= converted.sum(axis=1, keepdims=True)
+
+    # patients who enter a tunnel health state stay in it (and its tunnel states) for time_step, moving to the
+    # next tunnel state at every time step, and leave it as in prob_matrix after the last one
+    model_states = get_model_states(prob_matrix, delta_t, time_step)
+    n_states = len(prob_matrix)
+    expanded = np.zeros((len(model_states), len(model_states)))
+    expanded[:n_states, :n_states] = converted
+    for i in range(n_states):
+        if prob_matrix[i][i] == 0:
+            tunnel = [i] + [s.value for s in model_states[n_states:] if s.get_health_state().value == i]
+            expanded[i] = 0
+            for current_state, next_state in zip(tunnel[:-1], tunnel[1:]):
+                expanded[current_state, next_state] = 1
+            expanded[tunnel[-1], :n_states] = prob_matrix[i]
+    return expanded.tolist()
+
+
+def get_background_mortality_bands(inputs=Data):
+    """ :returns list of (age at which the band starts, annual probability of death from other causes);
+    a single band without background mortality if AGE_DEPENDENT_MORTALITY is False
+    :param inputs: model inputs (InputData or ModelInputs)
+    """
+
+    if not inputs.AGE_DEPENDENT_MORTALITY:
+        return [(0, 0.0)]
+
+    bands = []
+    for age, mortality in inputs.BACKGROUND_MORTALITY:
+        # consecutive age bands with the same mortality share one transition probability matrix
+        if len(bands) == 0 or bands[-1][1] != mortality:
+            bands.append((age, mortality))
+    return bands
+
+
+def add_background_mortality(prob_matrix, mortality):
+    """ :returns the transition probability matrix with background mortality added as a competing risk
+    :param prob_matrix: transition probability matrix
+    :param mortality: probability of death from other causes over the same time step
+    """
+
+    if mortality == 0:
+        return prob_matrix
+
+    death = HealthStats.DEATH.value
+    result = []
+    for s in HealthStats:
+        row = list(prob_matrix[s.value])
+        if s != HealthStats.DEATH:
+            # patients who do not die from other causes follow the original probabilities
+            row = [p * (1 - mortality) for p in row]
+            row[death] += mortality
+        result.append(row)
+    return result
+
+
+def calculate_band_prob_matrices(prob_matrix, delta_t, inputs=Data):
+    """ :returns the transition probability matrix over a time step of length delta_t in each age band
+    :param prob_matrix: transition probability matrix over a time step of TRANS_MATRIX_TIME_STEP
+                        (without background mortality)
+    :param delta_t: length of the simulation time step
+    :param inputs: model inputs (InputData or ModelInputs)
+    """
+    return [convert_prob_matrix(add_background_mortality(prob_matrix, mortality), delta_t,
+                                inputs.TRANS_MATRIX_TIME_STEP)
+            for age, mortality in get_background_mortality_bands(inputs)]
@@ -0,0 +1,105 @@
+import numpy as np
+import ParameterClasses as P
+import MarkovModelVectorized as VecCls
+import InputData as Data
+
+# probabilistic sensitivity analysis: the model is simulated under many parameter sets sampled from
+# the distributions of model inputs, and the mean outcomes of each parameter set are collected
+
+STRATEGY_NAMES = {
+    P.Therapies.NONE: 'No Therapy',
+    P.Therapies.ANTICOAG: 'Anticoagulation Therapy'
+}
+
+
+class PSA:
+    def __init__(self, n_parameter_sets, pop_size=None, seed=0):
+        """ create a probabilistic sensitivity analysis
+        :param n_parameter_sets: number of parameter sets to sample
+        :param pop_size: number of patients simulated under each parameter set (Data.POP_SIZE if not provided)
+        :param seed: seed of the random number generator used to sample parameter sets
+        """
+        self._popSize = Data.POP_SIZE if pop_size is None else pop_size
+        # all parameter sets are sampled at once
+        self._paramSampler = P.ParameterSetSampler(n_parameter_sets, seed)
+
+    def simulate(self, therapies=None):
+        """ simulates a cohort under each parameter set and each therapy
+        :param therapies: list of therapies to simulate (all therapies if not provided)
+        :returns outputs of the probabilistic sensitivity analysis
+        """
+
+        if therapies is None:
+            therapies = list(P.Therapies)
+
+        n_sets = self._paramSampler.get_n_sets()
+        mean_costs = {therapy: np.zeros(n_sets) for therapy in therapies}
+        mean_utilities = {therapy: np.zeros(n_sets) for therapy in therapies}
+        mean_survival_times = {therapy: np.zeros(n_sets) for therapy in therapies}
+
+        for i in range(n_sets):
+            for therapy in therapies:
+                # cohorts of the same parameter set share the cohort id, and so the random numbers,
+                # across therapies
+                cohort = VecCls.Cohort(
+                    id=i,
+                    therapy=therapy,
+                    pop_size=self._popSize,
+                    parameters=self._paramSampler.get_parameters(i, therapy))
+                survival_times, count_strokes, costs, utilities = cohort.simulate_outcomes()
+                mean_costs[therapy][i] = costs.mean()
+                mean_utilities[therapy][i] = utilities.mean()
+                # mean survival time of patients who have died
+                survival_times = survival_times[~np.isnan(survival_times)]
+                mean_survival_times[therapy][i] = survival_times.mean() if len(survival_times) > 0 else np.nan
+
+        return PSAOutputs(mean_costs, mean_utilities, mean_survival_times)
+
+
+class PSAOutputs:
+    def __init__(self, mean_costs, mean_utilities, mean_survival_times):
+        """ outputs of a probabilistic sensitivity analysis
+        :param mean_costs: dictionary of mean discounted cost of each parameter set, keyed by therapy
+        :param mean_utilities: dictionary of mean discounted utility of each parameter set, keyed by therapy
+        :param mean_survival_times: dictionary of mean survival time of each parameter set, keyed by therapy
+        """
+        self._meanCosts = mean_costs
+        self._meanUtilities = mean_utilities
+        self._meanSurvivalTimes = mean_survival_times
+
+    def get_therapies(self):
+        return list(self._meanCosts)
+
+    def get_mean_costs(self, therapy):
+        return self._meanCosts[therapy]
+
+    def get_mean_utilities(self, therapy):
+        return self._meanUtilities[therapy]
+
+    def get_mean_survival_times(self, therapy):
+        return self._meanSurvivalTimes[therapy]
+
+    def get_strategies(self):
+        """ :returns strategies (one per therapy) to pass to Econ.CEA or Econ.CBA;
+        observations are paired by parameter set, so use if_paired=True """
+        import scr.EconEvalClasses as Econ
+        return [Econ.Strategy(
+                    name=STRATEGY_NAMES[therapy],
+                    cost_obs=self._meanCosts[therapy],
+                    effect_obs=self._meanUtilities[therapy])
+                for therapy in self.get_therapies()]
+
+    def get_acceptability_curves(self, wtp_values):
+        """ :returns the probability that each therapy has the highest net monetary benefit at each
+        willingness-to-pay value (one row per therapy in the order of get_therapies())
+        :param wtp_values: willingness-to-pay values for one additional QALY
+        """
+
+        wtp_values = np.asarray(wtp_values, dtype=float)
+        # net monetary benefit of each therapy, parameter set and willingness-to-pay value
+        nmb = np.array([np.outer(self._meanUtilities[therapy], wtp_values) - self._meanCosts[therapy][:, np.newaxis]
+                        for therapy in self.get_therapies()])
+        # therapy with the highest net monetary benefit
+        best = nmb.argmax(axis=0)
+
+        return np.array([(best == i).mean(axis=0) for i in range(len(self.get_therapies()))])
@@ -1,23 +1,14 @@
 import ParameterClasses as P
-import MarkovModel as MarkovCls
+import BatchMarkovModel as Batch
 import SupportMarkovModel as SupportMarkov
-import scr.SamplePathClasses as PathCls
-import scr.FigureSupport as Figs
+import InputData as Data
 
-# create and cohort
-cohortNoTherapy = MarkovCls.Cohort(
-    id=0,
-    therapy=P.Therapies.NONE)
-
-simOutputs_none = cohortNoTherapy.simulate()
-
-
-# create and cohort
-cohortAnticoagTherapy = MarkovCls.Cohort(
-    id=1,
-    therapy=P.Therapies.ANTICOAG)
-
-simOutputs_anticoag = cohortAnticoagTherapy.simulate()
+# simulate the cohorts (or reuse them from the cache if an earlier script already simulated them)
+simOutputs = Batch.simulate_cohorts(
+    specs=[(P.Therapies.NONE, 0, None), (P.Therapies.ANTICOAG, 1, None)],
+    cache_dir=Data.CACHE_DIR)
+simOutputs_none = simOutputs[(P.Therapies.NONE, 0, None)]
+simOutputs_anticoag = simOutputs[(P.Therapies.ANTICOAG, 1, None)]
 
 # print outcomes (means and CIs)
 SupportMarkov.print_outcomes(simOutputs_anticoag, 'No treatment:')
@@ -0,0 +1,127 @@
+import numpy as np
+
+# counter-based random streams: the u-th uniform of a (cohort, patient, stream) is a hash of its key and the
+# counter u, so any patient's random numbers can be computed in O(1) without constructing or advancing a
+# generator, in bulk for many patients at once (vectorized engine), or one at a time (object engine).
+# Every engine that draws from the same streams therefore reproduces the same patient trajectories.
+# The hash is the SplitMix64 finalizer; keys are derived by hashing the seed, cohort id, patient index and
+# stream one after the other, so patients of different cohorts do not share correlated seeds and a patient's
+# random numbers do not depend on the population size.
+
+# streams of random numbers of a patient
+TRANSITIONS = 0     # one uniform per time step to sample the next health state
+
+_MASK = 0xFFFFFFFFFFFFFFFF
+_GOLDEN = 0x9E3779B97F4A7C15
+_MIX_1 = 0xBF58476D1CE4E5B9
+_MIX_2 = 0x94D049BB133111EB
+
+
+def _mix(z):
+    """ :returns the SplitMix64 finalizer of a 64-bit integer (Python int) """
+    z = ((z ^ (z >> 30)) * _MIX_1) & _MASK
+    z = ((z ^ (z >> 27)) * _MIX_2) & _MASK
+    return z ^ (z >> 31)
+
+
+def _mix_array(z):
+    """ :returns the SplitMix64 finalizer of an array of 64-bit integers (np.uint64) """
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(_MIX_1)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(_MIX_2)
+    return z ^ (z >> np.uint64(31))
+
+
+class RandomStreams:
+    def __init__(self, seed=0):
+        """ independent streams of random numbers for every (cohort, patient, stream)
+        :param seed: master seed
+        """
+        self._seed = seed
+        self._seedKey = _mix((seed * _GOLDEN) & _MASK)
+
+    def get_seed(self):
+        return self._seed
+
+    def get_key(self, cohort_id, patient_index, stream=TRANSITIONS):
+        """ :returns the 64-bit key of a stream of a patient
+        :param cohort_id: cohort id
+        :param patient_index: index of the patient in the cohort (0, 1, 2, ...)
+        :param stream: stream of the patient (for example TRANSITIONS)
+        """
+        key = self._seedKey
+        for part in (cohort_id, patient_index, stream):
+            key = _mix((key + _GOLDEN + _mix((part + _GOLDEN) & _MASK)) & _MASK)
+        return key
+
+    def get_keys(self, cohort_id, patient_indices, stream=TRANSITIONS):
+        """ :returns the keys of a stream of many patients as a NumPy array (np.uint64) """
+        with np.errstate(over='ignore'):
+            cohort_key = _mix((self._seedKey + _GOLDEN + _mix((cohort_id + _GOLDEN) & _MASK)) & _MASK)
+            parts = _mix_array(np.asarray(patient_indices, dtype=np.uint64) + np.uint64(_GOLDEN))
+            keys = _mix_array(np.uint64(cohort_key) + np.uint64(_GOLDEN) + parts)
+            stream_part = np.uint64(_mix((stream + _GOLDEN) & _MASK))
+            return _mix_array(keys + np.uint64(_GOLDEN) + stream_part)
+
+    def get_uniforms(self, cohort_id, patient_indices, counter, stream=TRANSITIONS):
+        """ :returns the counter-th uniform of a stream of many patients as a NumPy array
+        :param cohort_id: cohort id
+        :param patient_indices: indices of the patients in the cohort
+        :param counter: position of the uniform in the stream (a number or an array broadcast against
+                        patient_indices)
+        :param stream: stream of the patients
+        """
+        return get_uniforms(self.get_keys(cohort_id, patient_indices, stream), counter)
+
+    def get_rng(self, cohort_id, patient_index, stream=TRANSITIONS):
+        """ :returns a random number generator that draws the uniforms of a stream of a patient in order
+        (can be used wherever the model expects a random number generator with random_sample) """
+        return CounterRNG(self.get_key(cohort_id, patient_index, stream))
+
+    def get_generator(self, cohort_id, patient_index, stream=TRANSITIONS):
+        """ :returns an independent NumPy generator (Philox) of a stream of a patient for bulk draws from other
+        distributions; it is derived with SeedSequence from the same (seed, cohort, patient, stream) """
+        seed_sequence = np.random.SeedSequence(self._seed, spawn_key=(cohort_id, patient_index, stream))
+        return np.random.Generator(np.random.Philox(seed_sequence))
+
+
+class CounterRNG:
+    """ random number generator over one counter-based stream; the counter can be set to replay the stream
+    from any position """
+    __slots__ = ('_key', '_counter')
+
+    def __init__(self, key, counter=0):
+        """
+        :param key: 64-bit key of the stream
+        :param counter: position of the next uniform in the stream
+        """
+        self._key = key
+        self._counter = counter
+
+    def random_sample(self, size=None):
+        """ :returns the next uniform in [0, 1) (or a NumPy array of the next size uniforms) """
+        if size is None:
+            z = _mix((self._key + (self._counter + 1) * _GOLDEN) & _MASK)
+            self._counter += 1
+            return (z >> 11) * 2.0**-53
+        counters = np.arange(self._counter, self._counter + size, dtype=np.uint64)
+        self._counter += size
+        return get_uniforms(np.uint64(self._key), counters)
+
+    def sample(self):
+        return self.random_sample()
+
+    def get_counter(self):
+        return self._counter
+
+    def set_counter(self, counter):
+        """ moves to a position of the stream (the next uniform is the counter-th one) """
+        self._counter = counter
+
+
+def get_uniforms(keys, counters):
+    """ :returns the uniforms in [0, 1) at the given counters of streams with the given keys
+    (keys and counters are broadcast against each other) """
+    with np.errstate(over='ignore'):
+        z = np.asarray(keys, dtype=np.uint64) \
+            + (np.asarray(counters, dtype=np.uint64) + np.uint64(1)) * np.uint64(_GOLDEN)
+        return (_mix_array(z) >> np.uint64(11)) * 2.0**-53
@@ -0,0 +1,168 @@
+import concurrent.futures as futures
+import os
+import numpy as np
+import InputData as Settings
+
+# headless figures: every figure is drawn on a matplotlib Figure that is not attached to pyplot, so it is
+# rendered with the non-interactive Agg canvas and saved to a file without opening windows or changing the
+# matplotlib backend of the process. Figures are drawn from small pre-binned data that is prepared once per
+# scenario, so many scenarios can be rendered in parallel worker processes. (scipy and matplotlib are imported
+# only by the functions that need them.)
+
+LEGENDS = ['No Therapy', 'Anticoagulation Therapy']
+
+
+def get_report_data(simOutputs_none, simOutputs_anticoag, if_paired=False, bin_width=1,
+                    max_wtp=50000, max_cloud_points=1000, seed=0):
+    """ :returns the pre-binned and summarized data needed to draw the figures of one scenario
+    :param simOutputs_none: output of a cohort simulated under no therapy
+    :param simOutputs_anticoag: output of a cohort simulated under anticoagulation therapy
+    :param if_paired: set to True if both cohorts were simulated with common random numbers
+    :param bin_width: width of the bins of survival time histograms
+    :param max_wtp: largest willingness-to-pay value of the net monetary benefit figure
+    :param max_cloud_points: largest number of patients shown in the cloud of the cost-effectiveness plane
+    :param seed: seed used to subsample the cloud
+    """
+
+    outputs = [simOutputs_none, simOutputs_anticoag]
+    costs = [np.asarray(o.get_costs(), dtype=float) for o in outputs]
+    utilities = [np.asarray(o.get_utilities(), dtype=float) for o in outputs]
+
+    # survival curves and histograms of survival times (from the SurvivalCurve of each cohort)
+    curves = [o.get_survival_curve() for o in outputs]
+    survival_curves = [(curve.get_times(), curve.get_values()) for curve in curves]
+    histograms = [curve.get_bin_counts(bin_width) for curve in curves]
+
+    # incremental cost and utility of anticoagulation with respect to no therapy
+    if if_paired:
+        delta_costs = costs[1] - costs[0]
+        delta_utilities = utilities[1] - utilities[0]
+    else:
+        delta_costs = costs[1] - costs[0].mean()
+        delta_utilities = utilities[1] - utilities[0].mean()
+    rng = np.random.RandomState(seed)
+    cloud = rng.permutation(len(delta_costs))[:max_cloud_points]
+
+    # incremental net monetary benefit and its confidence interval at each willingness-to-pay value
+    wtp_values = np.linspace(0, max_wtp, 101)
+    if if_paired:
+        delta_nmb = np.outer(delta_utilities, wtp_values) - delta_costs[:, np.newaxis]
+        means = delta_nmb.mean(axis=0)
+        st_errs = delta_nmb.std(axis=0, ddof=1) / np.sqrt(len(delta_costs))
+        dof = len(delta_costs) - 1
+    else:
+        nmbs = [np.outer(u, wtp_values) - c[:, np.newaxis] for u, c in zip(utilities, costs)]
+        means = nmbs[1].mean(axis=0) - nmbs[0].mean(axis=0)
+        st_errs = np.sqrt(sum(nmb.var(axis=0, ddof=1) / len(nmb) for nmb in nmbs))
+        dof = len(costs[0]) + len(costs[1]) - 2
+    import scipy.stats as stat
+    half_lengths = stat.t.ppf(1 - Settings.ALPHA / 2, dof) * st_errs
+
+    return {
+        'survival_curves': survival_curves,
+        'histograms': histograms,
+        'bin_width': bin_width,
+        'ce_mean': (delta_utilities.mean(), delta_costs.mean()),
+        'ce_cloud': (delta_utilities[cloud], delta_costs[cloud]),
+        'nmb': (wtp_values, means, means - half_lengths, means + half_lengths)
+    }
+
+
+def _new_figure(figure_size=6):
+    """ :returns a figure that is not managed by pyplot (rendered with the Agg canvas) and its axes """
+    from matplotlib.figure import Figure
+    figure = Figure(figsize=(figure_size, figure_size))
+    return figure, figure.add_subplot(1, 1, 1)
+
+
+def save_survival_curves(survival_curves, path, legends=LEGENDS):
+    """ saves the survival curves (list of (times, number alive)) to a file """
+    figure, ax = _new_figure()
+    for (times, values), legend in zip(survival_curves, legends):
+        ax.step(times, values, where='post', label=legend)
+    ax.set_title('Survival curve')
+    ax.set_xlabel('Simulation time step (year)')
+    ax.set_ylabel('Number of alive patients')
+    ax.set_ylim(bottom=0)
+    ax.legend()
+    figure.savefig(path)
+
+
+def save_histograms(histograms, bin_width, path, legends=LEGENDS, transparency=0.6):
+    """ saves histograms from pre-binned counts (list of (left edges of bins, counts)) to a file """
+    figure, ax = _new_figure()
+    for (edges, counts), legend in zip(histograms, legends):
+        ax.bar(edges, counts, width=bin_width, align='edge', alpha=transparency, label=legend)
+    ax.set_title('Histogram of patient survival time')
+    ax.set_xlabel('Survival time (year)')
+    ax.set_ylabel('Counts')
+    ax.legend()
+    figure.savefig(path)
+
+
+def save_CE_plane(ce_mean, ce_cloud, path, transparency=0.3):
+    """ saves the cost-effectiveness plane of anticoagulation with respect to no therapy to a file """
+    figure, ax = _new_figure()
+    ax.scatter(ce_cloud[0], ce_cloud[1], s=4, alpha=transparency, color='tab:orange')
+    ax.scatter([0, ce_mean[0]], [0, ce_mean[1]], color=['tab:blue', 'tab:orange'], edgecolors='black', zorder=3)
+    ax.annotate(LEGENDS[0], (0, 0))
+    ax.annotate(LEGENDS[1], ce_mean)
+    ax.axhline(0, color='gray', linewidth=0.5)
+    ax.axvline(0, color='gray', linewidth=0.5)
+    ax.set_title('Cost-Effectiveness Analysis')
+    ax.set_xlabel('Additional discounted utility')
+    ax.set_ylabel('Additional discounted cost')
+    figure.savefig(path)
+
+
+def save_deltaNMB_lines(nmb, path):
+    """ saves the incremental net monetary benefit (and its confidence interval) of anticoagulation
+    with respect to no therapy to a file """
+    wtp_values, means, lower, upper = nmb
+    figure, ax = _new_figure()
+    ax.plot(wtp_values, means, label=LEGENDS[1])
+    ax.fill_between(wtp_values, lower, upper, alpha=0.2)
+    ax.axhline(0, color='gray', linewidth=0.5)
+    ax.set_title('Cost-Benefit Analysis')
+    ax.set_xlabel('Willingness-to-pay for one additional QALY ($)')
+    ax.set_ylabel('Incremental Net Monetary Benefit ($)')
+    ax.legend()
+    figure.savefig(path)
+
+
+def render_report(report_data, output_dir, prefix=''):
+    """ saves all figures of one scenario
+    :param report_data: data returned by get_report_data
+    :param output_dir: directory to save the figures to (created if it does not exist)
+    :param prefix: prefix of the file names
+    :returns the paths of the saved figures
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    paths = [os.path.join(output_dir, prefix + name + '.png')
+             for name in ['survival_curves', 'survival_histograms', 'CE_plane', 'deltaNMB']]
+
+    save_survival_curves(report_data['survival_curves'], paths[0])
+    save_histograms(report_data['histograms'], report_data['bin_width'], paths[1])
+    save_CE_plane(report_data['ce_mean'], report_data['ce_cloud'], paths[2])
+    save_deltaNMB_lines(report_data['nmb'], paths[3])
+
+    return paths
+
+
+def render_reports(scenarios, output_dir, n_workers=None, if_paired=False):
+    """ saves the figures of many scenarios, rendered in parallel worker processes
+    :param scenarios: list of (scenario name, output under no therapy, output under anticoagulation)
+    :param output_dir: directory to save the figures to
+    :param n_workers: number of worker processes (by default the number of processors)
+    :param if_paired: set to True if the cohorts of each scenario were simulated with common random numbers
+    :returns dictionary of the paths of the saved figures keyed by scenario name
+    """
+
+    # only the small pre-binned data of each scenario is sent to the workers
+    names = [name for name, simOutputs_none, simOutputs_anticoag in scenarios]
+    report_data = [get_report_data(simOutputs_none, simOutputs_anticoag, if_paired=if_paired)
+                   for name, simOutputs_none, simOutputs_anticoag in scenarios]
+
+    with futures.ProcessPoolExecutor(max_workers=n_workers) as executor:
+        paths = executor.map(render_report, report_data, [output_dir] * len(names), [name + '_' for name in names])
+        return dict(zip(names, paths))
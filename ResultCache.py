@@ -0,0 +1,139 @@
+import collections
+import hashlib
+import json
+import math
+import os
+import numpy as np
+import ParameterClasses as P
+
+# on-disk cache of cohort outcomes; entries are addressed by a hash of everything that determines the outcomes
+
+# version of the format of cache entries (part of the fingerprint so entries of older formats are never reused)
+CACHE_FORMAT = 3
+
+
+def get_fingerprint(param, cohort_id, pop_size, sim_length, streams_seed=None):
+    """ :returns a hash of the effective configuration of a cohort simulation
+    :param param: parameter object of the cohort
+    :param cohort_id: cohort id (seed of the random number generators)
+    :param pop_size: cohort population size
+    :param sim_length: simulation length
+    :param streams_seed: master seed of the RandomStreams of the cohort (None if patients seed their own
+                         generators with their ids)
+    """
+
+    config = {
+        'format': CACHE_FORMAT,
+        'therapy': param.get_therapy().name,
+        'cohort_id': cohort_id,
+        'pop_size': pop_size,
+        'sim_length': sim_length,
+        'streams_seed': streams_seed,
+        'delta_t': param.get_delta_t(),
+        'adj_discount_rate': param.get_adj_discount_rate(),
+        'initial_state': param.get_initial_health_state().name,
+        'prob_matrices': param.get_prob_matrices().tolist(),
+        'band_index': param.get_band_index(math.ceil(sim_length / param.get_delta_t()) + 1).tolist(),
+        'state_costs': [float(param.get_annual_state_cost(s)) for s in P.HealthStats],
+        'state_utilities': [float(param.get_annual_state_utility(s)) for s in P.HealthStats],
+        'treatment_cost': float(param.get_annual_treatment_cost())
+    }
+    # floats are written with repr precision, so different parameter values never share a key
+    return hashlib.sha256(json.dumps(config, sort_keys=True).encode()).hexdigest()
+
+
+class DiskCache:
+    def __init__(self, cache_dir, max_bytes=None):
+        """ cache of cohort outcomes stored as one .npz file per entry; when the cache grows beyond max_bytes
+        the least recently used entries are evicted
+        :param cache_dir: directory of the cache (created if it does not exist)
+        :param max_bytes: maximum total size of the entries (no limit if not provided)
+        """
+        self._cacheDir = cache_dir
+        self._maxBytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+        # size of each entry, ordered from the least to the most recently used
+        # (files of earlier runs are ordered by their modification time)
+        self._entries = collections.OrderedDict()
+        files = [f for f in os.listdir(cache_dir) if f.endswith('.npz') and not f.endswith('.tmp.npz')]
+        for f in sorted(files, key=lambda f: os.path.getmtime(os.path.join(cache_dir, f))):
+            self._entries[f[:-len('.npz')]] = os.path.getsize(os.path.join(cache_dir, f))
+        self._totalBytes = sum(self._entries.values())
+
+        # counters
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def _get_path(self, key):
+        return os.path.join(self._cacheDir, key + '.npz')
+
+    def get(self, key):
+        """ :returns the cohort stored under the key or None if the key is not in the cache """
+
+        path = self._get_path(key)
+        if key not in self._entries or not os.path.exists(path):
+            self._misses += 1
+            return None
+
+        with np.load(path) as data:
+            cohort = StoredCohort(
+                outcomes=(data['survival_times'], data['count_strokes'], data['costs'], data['utilities']),
+                initial_pop_size=int(data['initial_pop_size']))
+
+        # mark the entry as the most recently used (also on disk for later runs)
+        self._entries.move_to_end(key)
+        os.utime(path)
+        self._hits += 1
+        return cohort
+
+    def put(self, key, cohort):
+        """ stores the outcomes of a simulated cohort under the key """
+
+        survival_times, count_strokes, costs, utilities = cohort.get_outcomes()
+        # write to a temporary file first so that a crash never leaves a partial entry behind
+        # (outcomes are stored with the types of CohortOutputs, so a hit returns the same types as a miss)
+        temp_path = self._get_path(key + '.tmp')
+        np.savez(temp_path,
+                 survival_times=np.asarray(survival_times, dtype=np.float64),
+                 count_strokes=np.asarray(count_strokes, dtype=np.int32),
+                 costs=np.asarray(costs, dtype=np.float64),
+                 utilities=np.asarray(utilities, dtype=np.float64),
+                 initial_pop_size=cohort.get_initial_pop_size())
+        os.replace(temp_path, self._get_path(key))
+
+        self._totalBytes -= self._entries.pop(key, 0)
+        self._entries[key] = os.path.getsize(self._get_path(key))
+        self._totalBytes += self._entries[key]
+
+        # evict the least recently used entries (but never the new entry)
+        while self._maxBytes is not None and self._totalBytes > self._maxBytes and len(self._entries) > 1:
+            old_key, size = self._entries.popitem(last=False)
+            os.remove(self._get_path(old_key))
+            self._totalBytes -= size
+            self._evictions += 1
+
+    def get_total_bytes(self):
+        return self._totalBytes
+
+    def get_counters(self):
+        """ :returns the number of cache hits, misses and evictions """
+        return {'hits': self._hits, 'misses': self._misses, 'evictions': self._evictions}
+
+
+class StoredCohort:
+    def __init__(self, outcomes, initial_pop_size):
+        """ outcomes of a previously simulated cohort (can be passed to CohortOutputs)
+        :param outcomes: (survival times (nan for patients who are alive), number of strokes, discounted costs,
+                         discounted utilities)
+        :param initial_pop_size: cohort population size
+        """
+        self._outcomes = outcomes
+        self._initial_pop_size = initial_pop_size
+
+    def get_initial_pop_size(self):
+        return self._initial_pop_size
+
+    def get_outcomes(self):
+        return self._outcomes
@@ -1,15 +1,14 @@
 import ParameterClasses as P
-import MarkovModel as MarkovCls
+import BatchMarkovModel as Batch
 import SupportMarkovModel as SupportMarkov
 import scr.SamplePathClasses as PathCls
 import scr.FigureSupport as Figs
+import InputData as Data
 
-# create and cohort
-cohort = MarkovCls.Cohort(
-    id=0,
-    therapy=P.Therapies.NONE)
-
-simOutputs = cohort.simulate()
+# simulate the cohort (or reuse it from the cache if an earlier script already simulated it)
+simOutputs = Batch.simulate_cohorts(
+    specs=[(P.Therapies.NONE, 0, None)],
+    cache_dir=Data.CACHE_DIR)[(P.Therapies.NONE, 0, None)]
 
 # graph survival curve
 PathCls.graph_sample_path(
@@ -1,15 +1,14 @@
 import ParameterClasses as P
-import MarkovModel as MarkovCls
+import BatchMarkovModel as Batch
 import SupportMarkovModel as SupportMarkov
 import scr.SamplePathClasses as PathCls
 import scr.FigureSupport as Figs
+import InputData as Data
 
-# create and simulate cohort
-cohort = MarkovCls.Cohort(
-    id=1,
-    therapy=P.Therapies.ANTICOAG)
-
-simOutputs = cohort.simulate()
+# simulate the cohort (or reuse it from the cache if an earlier script already simulated it)
+simOutputs = Batch.simulate_cohorts(
+    specs=[(P.Therapies.ANTICOAG, 1, None)],
+    cache_dir=Data.CACHE_DIR)[(P.Therapies.ANTICOAG, 1, None)]
 
 
 # graph survival curve
@@ -0,0 +1,29 @@
+import scr.EconEvalClasses as Econ
+import ProbabilisticSensitivity as PSA
+import InputData as Settings
+
+# sample parameter sets and simulate a cohort under each parameter set and therapy
+psa = PSA.PSA(n_parameter_sets=1000, pop_size=1000, seed=0)
+psaOutputs = psa.simulate()
+
+# CEA (observations of both strategies come from the same parameter sets)
+CEA = Econ.CEA(
+    strategies=psaOutputs.get_strategies(),
+    if_paired=True
+    )
+# report the CE table
+CEA.build_CE_table(
+    interval=Econ.Interval.PREDICTION,
+    alpha=Settings.ALPHA,
+    cost_digits=0,
+    effect_digits=2,
+    icer_digits=2,
+)
+
+# acceptability curves
+wtp_values = range(0, 50001, 5000)
+acceptability = psaOutputs.get_acceptability_curves(wtp_values)
+print("Probability of being the most cost-effective therapy:")
+for i, therapy in enumerate(psaOutputs.get_therapies()):
+    print("  {}:".format(PSA.STRATEGY_NAMES[therapy]),
+          ", ".join("${}: {:.2f}".format(wtp, prob) for wtp, prob in zip(wtp_values, acceptability[i])))
@@ -0,0 +1,265 @@
+import concurrent.futures
+import hashlib
+import itertools
+import json
+import os
+import numpy as np
+import ParameterClasses as P
+import MarkovModelDeterministic as DetCls
+import MarkovModelVectorized as VecCls
+import MarkovModelEventDriven as EventCls
+import InputData as Data
+
+# scenario sweep: the model is evaluated under many sets of overridden InputData values (a grid or a list of
+# scenarios, or the low and high values of each input for one-way sensitivity analysis). Parameters of each
+# scenario are built from its overrides without modifying InputData, scenarios run on a pool of worker
+# processes, and the result of each scenario is appended to a JSON lines file as soon as it finishes, so an
+# interrupted sweep resumes with the scenarios that are not yet in the file.
+
+# engines that can evaluate a scenario ('trace' returns the exact expected outcomes; the simulation engines
+# share the random numbers of each patient across therapies and scenarios (common random numbers))
+ENGINES = ['trace', 'vectorized', 'event', 'compiled']
+
+# outcomes that compare anticoagulation with no therapy
+DELTA_COST = 'delta_cost'
+DELTA_UTILITY = 'delta_utility'
+ICER = 'icer'
+DELTA_NMB = 'delta_nmb'
+
+
+def get_grid(values):
+    """ :returns the list of scenarios of all combinations of the given values
+    :param values: dictionary of the values of each model input, for example
+                   {'RR_STROKE': [0.5, 0.65], 'DISCOUNT': [0, 0.03, 0.05]}
+    """
+    names = sorted(values)
+    return [dict(zip(names, combination)) for combination in itertools.product(*[values[n] for n in names])]
+
+
+def get_one_way_scenarios(ranges):
+    """ :returns the list of scenarios of a one-way sensitivity analysis: the base case (no overrides) and
+    the low and high value of each model input with all other inputs at their base values
+    :param ranges: dictionary of (low value, high value) of each model input, for example
+                   {'RR_STROKE': (0.5, 0.85), 'ANTICOAGULANT_COST': (1500, 2500)}
+    """
+    scenarios = [{}]
+    for name, (low, high) in ranges.items():
+        scenarios.append({name: low})
+        scenarios.append({name: high})
+    return scenarios
+
+
+def simulate_scenario(overrides, engine='trace', pop_size=None, cohort_id=0):
+    """ evaluates both therapies under one scenario
+    :param overrides: dictionary of values that replace the InputData constants of the same names
+    :param engine: one of ENGINES
+    :param pop_size: cohort population size of the simulation engines (Data.POP_SIZE if not provided)
+    :param cohort_id: cohort id of the simulation engines (seed of the random number generators)
+    :returns dictionary of the mean outcomes of each therapy (keyed by therapy name) and the comparison
+    of anticoagulation with no therapy
+    """
+
+    if engine not in ENGINES:
+        raise ValueError('Unknown engine {}; expected one of {}.'.format(engine, ENGINES))
+    if pop_size is None:
+        pop_size = Data.POP_SIZE
+
+    outcomes = {}
+    for therapy in P.Therapies:
+        param = P.ParametersFixed(therapy, overrides)
+        sim_length = param.get_inputs().SIM_LENGTH
+
+        if engine == 'trace':
+            outputs = DetCls.CohortTrace(therapy, parameters=param).simulate(sim_length)
+            outcomes[therapy.name] = {
+                'cost': outputs.get_mean_discounted_cost(),
+                'utility': outputs.get_mean_discounted_utility(),
+                'survival_time': outputs.get_mean_survival_time(),
+                'count_strokes': outputs.get_mean_count_strokes()}
+            continue
+
+        if engine == 'vectorized':
+            cohort = VecCls.Cohort(id=cohort_id, therapy=therapy, pop_size=pop_size, parameters=param)
+        elif engine == 'event':
+            cohort = EventCls.Cohort(id=cohort_id, therapy=therapy, pop_size=pop_size, parameters=param)
+        else:
+            # Numba is only imported by the compiled engine
+            import MarkovModelCompiled as CompiledCls
+            cohort = CompiledCls.Cohort(id=cohort_id, therapy=therapy, pop_size=pop_size, parameters=param)
+        survival_times, count_strokes, costs, utilities = cohort.simulate_outcomes(sim_length)
+        # mean survival time of patients who have died
+        survival_times = survival_times[~np.isnan(survival_times)]
+        outcomes[therapy.name] = {
+            'cost': float(np.mean(costs)),
+            'utility': float(np.mean(utilities)),
+            'survival_time': float(survival_times.mean()) if len(survival_times) > 0 else None,
+            'count_strokes': float(np.mean(count_strokes))}
+
+    # comparison of anticoagulation with no therapy
+    delta_cost = outcomes[P.Therapies.ANTICOAG.name]['cost'] - outcomes[P.Therapies.NONE.name]['cost']
+    delta_utility = outcomes[P.Therapies.ANTICOAG.name]['utility'] - outcomes[P.Therapies.NONE.name]['utility']
+    outcomes[DELTA_COST] = delta_cost
+    outcomes[DELTA_UTILITY] = delta_utility
+    outcomes[ICER] = delta_cost / delta_utility if delta_utility != 0 else None
+    return outcomes
+
+
+class ScenarioSweep:
+    def __init__(self, scenarios, output_path, engine='trace', pop_size=None, cohort_id=0):
+        """ create a sweep over scenarios whose results are stored in a JSON lines file
+        :param scenarios: list of dictionaries of overridden model inputs (see get_grid and get_one_way_scenarios)
+        :param output_path: JSON lines file of the results (one line per scenario, appended as scenarios finish);
+                            results of scenarios that are already in the file are reused
+        :param engine: one of ENGINES
+        :param pop_size: cohort population size of the simulation engines (Data.POP_SIZE if not provided)
+        :param cohort_id: cohort id of the simulation engines (seed of the random number generators)
+        """
+
+        if engine not in ENGINES:
+            raise ValueError('Unknown engine {}; expected one of {}.'.format(engine, ENGINES))
+
+        self._scenarios = [dict(scenario) for scenario in scenarios]
+        self._outputPath = output_path
+        self._engine = engine
+        self._popSize = Data.POP_SIZE if pop_size is None else pop_size
+        self._cohortId = cohort_id
+        # every scenario is identified by a hash of its overrides and the settings of the sweep
+        self._keys = [self.get_key(scenario) for scenario in self._scenarios]
+
+    def get_key(self, overrides):
+        """ :returns the key of a scenario in the output file """
+        config = {
+            'overrides': overrides,
+            'engine': self._engine,
+            'pop_size': self._popSize if self._engine != 'trace' else None,
+            'cohort_id': self._cohortId if self._engine != 'trace' else None
+        }
+        return hashlib.sha256(json.dumps(config, sort_keys=True).encode()).hexdigest()
+
+    def run(self, n_workers=None):
+        """ evaluates the scenarios that are not yet in the output file
+        :param n_workers: number of worker processes (all CPUs if not provided; 1 to run in this process)
+        :returns the number of scenarios evaluated in this run
+        """
+
+        # scenarios to evaluate (each distinct scenario once)
+        completed = self._read_records()
+        pending = {}
+        for key, scenario in zip(self._keys, self._scenarios):
+            if key not in completed and key not in pending:
+                pending[key] = scenario
+        if len(pending) == 0:
+            return 0
+
+        self._repair_output()
+        with open(self._outputPath, 'a') as output_file:
+
+            if n_workers == 1:
+                for key, scenario in pending.items():
+                    self._write_record(output_file, key, scenario, simulate_scenario(
+                        scenario, self._engine, self._popSize, self._cohortId))
+                return len(pending)
+
+            # results are written in the order in which the scenarios finish
+            with concurrent.futures.ProcessPoolExecutor(max_workers=n_workers) as executor:
+                futures = {executor.submit(simulate_scenario, scenario, self._engine, self._popSize,
+                                           self._cohortId): key
+                           for key, scenario in pending.items()}
+                for future in concurrent.futures.as_completed(futures):
+                    key = futures[future]
+                    self._write_record(output_file, key, pending[key], future.result())
+
+        return len(pending)
+
+    def get_results(self):
+        """ :returns list of (overrides, outcomes) of the scenarios in the order they were given
+        (outcomes are None for scenarios that are not yet evaluated) """
+        records = self._read_records()
+        return [(scenario, records[key]['outcomes'] if key in records else None)
+                for key, scenario in zip(self._keys, self._scenarios)]
+
+    def get_n_completed(self):
+        """ :returns the number of scenarios whose results are in the output file """
+        records = self._read_records()
+        return sum(key in records for key in self._keys)
+
+    def _read_records(self):
+        """ :returns dictionary of the records of the output file keyed by scenario key """
+        records = {}
+        if not os.path.exists(self._outputPath):
+            return records
+        with open(self._outputPath) as output_file:
+            for line in output_file:
+                # the last line of an interrupted run may be incomplete
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                records[record['key']] = record
+        return records
+
+    def _repair_output(self):
+        """ removes the incomplete last line that an interrupted run may have left in the output file """
+        if not os.path.exists(self._outputPath):
+            return
+        with open(self._outputPath, 'rb+') as output_file:
+            content = output_file.read()
+            if len(content) > 0 and not content.endswith(b'\n'):
+                output_file.truncate(content.rfind(b'\n') + 1)
+
+    @staticmethod
+    def _write_record(output_file, key, overrides, outcomes):
+        """ appends the result of a scenario to the output file and flushes it to disk """
+        output_file.write(json.dumps({'key': key, 'overrides': overrides, 'outcomes': outcomes}) + '\n')
+        output_file.flush()
+        os.fsync(output_file.fileno())
+
+
+def get_outcome(outcomes, outcome, wtp=None):
+    """ :returns an outcome of a scenario
+    :param outcomes: outcomes of a scenario (see simulate_scenario)
+    :param outcome: DELTA_COST, DELTA_UTILITY, ICER or DELTA_NMB
+    :param wtp: willingness-to-pay per unit of utility (required for DELTA_NMB)
+    """
+    if outcome == DELTA_NMB:
+        if wtp is None:
+            raise ValueError('The net monetary benefit requires a willingness-to-pay.')
+        return wtp * outcomes[DELTA_UTILITY] - outcomes[DELTA_COST]
+    return outcomes[outcome]
+
+
+def get_tornado_data(results, ranges, outcome=DELTA_NMB, wtp=50000):
+    """ :returns data of a tornado diagram: dictionary with the outcome of the base case ('base') and one bar
+    per model input ('bars', ordered from the largest to the smallest swing), each a dictionary of the input
+    name, its low and high values, the outcome at these values and the swing (absolute difference)
+    :param results: list of (overrides, outcomes) of the scenarios of get_one_way_scenarios(ranges)
+                    (see ScenarioSweep.get_results)
+    :param ranges: dictionary of (low value, high value) of each model input
+    :param outcome: DELTA_COST, DELTA_UTILITY, ICER or DELTA_NMB
+    :param wtp: willingness-to-pay per unit of utility (used for DELTA_NMB)
+    """
+
+    # outcomes of the scenarios keyed by their overrides
+    outcomes = {json.dumps(overrides, sort_keys=True): scenario_outcomes
+                for overrides, scenario_outcomes in results if scenario_outcomes is not None}
+
+    def find(overrides):
+        key = json.dumps(overrides, sort_keys=True)
+        if key not in outcomes:
+            raise ValueError('Scenario {} has not been evaluated.'.format(overrides))
+        return get_outcome(outcomes[key], outcome, wtp)
+
+    bars = []
+    for name, (low, high) in ranges.items():
+        outcome_low = find({name: low})
+        outcome_high = find({name: high})
+        if outcome_low is None or outcome_high is None:
+            swing = None
+        else:
+            swing = abs(outcome_high - outcome_low)
+        bars.append({'input': name, 'low': low, 'high': high,
+                     'outcome_low': outcome_low, 'outcome_high': outcome_high, 'swing': swing})
+
+    # inputs with undefined outcomes (for example an ICER without utility gain) are placed last
+    bars.sort(key=lambda bar: -bar['swing'] if bar['swing'] is not None else float('inf'))
+    return {'base': find({}), 'bars': bars}
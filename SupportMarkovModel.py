@@ -1,9 +1,12 @@
 import InputData as Settings
 import scr.FormatFunctions as F
-import scr.SamplePathClasses as PathCls
-import scr.FigureSupport as Figs
 import scr.StatisticalClasses as Stat
-import scr.EconEvalClasses as Econ
+import ReportFigures as Report
+import numpy as np
+import os
+
+# the figures (matplotlib) and economic evaluation classes of the support library are imported by the
+# functions that use them, so scripts that only print outcomes do not load them
 
 
 def print_outcomes(simOutput, therapy_name):
@@ -49,12 +52,29 @@ def print_outcomes(simOutput, therapy_name):
           utility_mean_CI_text)
     print("")
 
-def draw_survival_curves_and_histograms(simOutputs_none, simOutputs_anticoag):
+def draw_survival_curves_and_histograms(simOutputs_none, simOutputs_anticoag, output_dir=None):
         """ draws the survival curves and the histograms of time until death
         :param simOutputs_none: output of a cohort simulated under no therapy
         :param simOutputs_anticoag: output of a cohort simulated under anticoagulation therapy
+        :param output_dir: if provided, the figures are saved to this directory instead of being displayed
         """
 
+        if output_dir is not None:
+            # headless mode: survival curves and pre-binned histograms are rendered to files
+            os.makedirs(output_dir, exist_ok=True)
+            curves = [simOutputs_none.get_survival_curve(), simOutputs_anticoag.get_survival_curve()]
+            Report.save_survival_curves(
+                survival_curves=[(curve.get_times(), curve.get_values()) for curve in curves],
+                path=os.path.join(output_dir, 'survival_curves.png'))
+            Report.save_histograms(
+                histograms=[curve.get_bin_counts(bin_width=1) for curve in curves],
+                bin_width=1,
+                path=os.path.join(output_dir, 'survival_histograms.png'))
+            return
+
+        import scr.SamplePathClasses as PathCls
+        import scr.FigureSupport as Figs
+
         # get survival curves of both treatments
         survival_curves = [
             simOutputs_none.get_survival_curve(),
@@ -87,33 +107,72 @@ def draw_survival_curves_and_histograms(simOutputs_none, simOutputs_anticoag):
             transparency=0.6
         )
 
-def print_comparative_outcomes(simOutputs_none, simOutputs_anticoag):
+def get_difference_stat(name, x, y_ref, if_paired):
+    """ :returns the statistics of the difference x - y_ref
+    :param if_paired: set to True if the i-th observations of x and y_ref come from the same patient
+                      simulated with common random numbers
+    """
+    if if_paired:
+        if len(x) != len(y_ref):
+            raise ValueError('Paired comparison requires cohorts of the same population size.')
+        return Stat.DifferenceStatPaired(name=name, x=x, y_ref=y_ref)
+    else:
+        return Stat.DifferenceStatIndp(name=name, x=x, y_ref=y_ref)
+
+
+def print_comparative_outcomes(simOutputs_none, simOutputs_anticoag, if_paired=False, sim_length=None):
     """ prints average increase in survival time, discounted cost, and discounted utility
     under combination therapy compared to mono therapy
     :param simOutputs_none: output of a cohort simulated under mono therapy
     :param simOutputs_anticoag: output of a cohort simulated under combination therapy
+    :param if_paired: set to True if both cohorts were simulated with the same cohort id and population size,
+                      so patient i consumed the same random numbers under both therapies
+    :param sim_length: simulation length of both cohorts (Settings.SIM_LENGTH if not provided); in a paired
+                       comparison, the restricted mean survival time up to this time is compared
     """
 
     # increase in survival time under combination therapy with respect to mono therapy
-    increase_survival_time = Stat.DifferenceStatIndp(
-        name='Increase in survival time',
-        x=simOutputs_anticoag.get_survival_times(),
-        y_ref=simOutputs_none.get_survival_times())
+    if if_paired:
+        # patient i must have consumed the same random numbers in both cohorts
+        if simOutputs_none.get_cohort_id() != simOutputs_anticoag.get_cohort_id() \
+                or simOutputs_none.get_streams_seed() != simOutputs_anticoag.get_streams_seed():
+            raise ValueError('Paired comparison requires cohorts with the same cohort id and random streams.')
+        survival_none = simOutputs_none.get_survival_times_by_patient()
+        survival_anticoag = simOutputs_anticoag.get_survival_times_by_patient()
+        if len(survival_none) != len(survival_anticoag):
+            raise ValueError('Paired comparison requires cohorts of the same population size.')
+
+        # all patients are compared by their survival time restricted to the simulation length (patients who
+        # are alive at the end of simulation are censored there), so no pair is dropped
+        if sim_length is None:
+            sim_length = Settings.SIM_LENGTH
+        survival_label = "restricted mean survival time (up to {} years)".format(sim_length)
+        increase_survival_time = Stat.DifferenceStatPaired(
+            name='Increase in restricted mean survival time',
+            x=np.where(np.isnan(survival_anticoag), sim_length, np.minimum(survival_anticoag, sim_length)),
+            y_ref=np.where(np.isnan(survival_none), sim_length, np.minimum(survival_none, sim_length)))
+    else:
+        survival_label = "survival time"
+        increase_survival_time = Stat.DifferenceStatIndp(
+            name='Increase in survival time',
+            x=simOutputs_anticoag.get_survival_times(),
+            y_ref=simOutputs_none.get_survival_times())
 
     # estimate and CI
     estimate_CI = F.format_estimate_interval(
         estimate=increase_survival_time.get_mean(),
         interval=increase_survival_time.get_t_CI(alpha=Settings.ALPHA),
         deci=2)
-    print("Average increase in survival time "
-          "and {:.{prec}%} confidence interval:".format(1 - Settings.ALPHA, prec=0),
+    print("Average increase in {} "
+          "and {:.{prec}%} confidence interval:".format(survival_label, 1 - Settings.ALPHA, prec=0),
            estimate_CI)
 
     # increase in discounted total cost under combination therapy with respect to mono therapy
-    increase_discounted_cost = Stat.DifferenceStatIndp(
+    increase_discounted_cost = get_difference_stat(
         name='Increase in discounted cost',
         x=simOutputs_anticoag.get_costs(),
-        y_ref=simOutputs_none.get_costs())
+        y_ref=simOutputs_none.get_costs(),
+        if_paired=if_paired)
 
     # estimate and CI
     estimate_CI = F.format_estimate_interval(
@@ -126,10 +185,11 @@ def print_comparative_outcomes(simOutputs_none, simOutputs_anticoag):
           estimate_CI)
 
     # increase in discounted total utility under combination therapy with respect to mono therapy
-    increase_discounted_utility = Stat.DifferenceStatIndp(
+    increase_discounted_utility = get_difference_stat(
         name='Increase in discounted cost',
         x=simOutputs_anticoag.get_utilities(),
-        y_ref=simOutputs_none.get_utilities())
+        y_ref=simOutputs_none.get_utilities(),
+        if_paired=if_paired)
 
     # estimate and CI
     estimate_CI = F.format_estimate_interval(
@@ -140,11 +200,15 @@ def print_comparative_outcomes(simOutputs_none, simOutputs_anticoag):
           "and {:.{prec}%} confidence interval:".format(1 - Settings.ALPHA, prec=0),
           estimate_CI)
 
-def report_CEA_CBA(simOutputs_none, simOutputs_anticoag):
+def report_CEA_CBA(simOutputs_none, simOutputs_anticoag, if_paired=False, output_dir=None):
     """ performs cost-effectiveness analysis
     :param simOutputs_none: output of a cohort simulated under mono therapy
     :param simOutputs_anticoag: output of a cohort simulated under combination therapy
+    :param if_paired: set to True if both cohorts were simulated with the same cohort id and population size
+    :param output_dir: if provided, the CE plane and the net monetary benefit figure are saved to this
+                       directory instead of being displayed
         """
+    import scr.EconEvalClasses as Econ
 
     # define two strategies
     no_therapy_strategy = Econ.Strategy(
@@ -161,19 +225,26 @@ def report_CEA_CBA(simOutputs_none, simOutputs_anticoag):
     # CEA
     CEA = Econ.CEA(
         strategies=[no_therapy_strategy, anticoag_therapy_strategy],
-        if_paired=False
+        if_paired=if_paired
+        )
+    if output_dir is not None:
+        # headless mode: figures are rendered to files from summarized data
+        os.makedirs(output_dir, exist_ok=True)
+        report_data = Report.get_report_data(simOutputs_none, simOutputs_anticoag, if_paired=if_paired)
+        Report.save_CE_plane(report_data['ce_mean'], report_data['ce_cloud'],
+                             path=os.path.join(output_dir, 'CE_plane.png'))
+    else:
+        # show the CE plane
+        CEA.show_CE_plane(
+            title='Cost-Effectiveness Analysis',
+            x_label='Additional discounted utility',
+            y_label='Additional discounted cost',
+            show_names=True,
+            show_clouds=True,
+            show_legend=True,
+            figure_size=6,
+            transparency=0.3
         )
-    # show the CE plane
-    CEA.show_CE_plane(
-        title='Cost-Effectiveness Analysis',
-        x_label='Additional discounted utility',
-        y_label='Additional discounted cost',
-        show_names=True,
-        show_clouds=True,
-        show_legend=True,
-        figure_size=6,
-        transparency=0.3
-    )
     # report the CE table
     CEA.build_CE_table(
         interval=Econ.Interval.CONFIDENCE,
@@ -184,18 +255,21 @@ def report_CEA_CBA(simOutputs_none, simOutputs_anticoag):
     )
 
     # CBA
-    NBA = Econ.CBA(
-        strategies=[no_therapy_strategy, anticoag_therapy_strategy],
-        if_paired=False
+    if output_dir is not None:
+        Report.save_deltaNMB_lines(report_data['nmb'], path=os.path.join(output_dir, 'deltaNMB.png'))
+    else:
+        NBA = Econ.CBA(
+            strategies=[no_therapy_strategy, anticoag_therapy_strategy],
+            if_paired=if_paired
+            )
+        # show the net monetary benefit figure
+        NBA.graph_deltaNMB_lines(
+            min_wtp=0,
+            max_wtp=50000,
+            title='Cost-Benefit Analysis',
+            x_label='Willingness-to-pay for one additional QALY ($)',
+            y_label='Incremental Net Monetary Benefit ($)',
+            interval=Econ.Interval.CONFIDENCE,
+            show_legend=True,
+            figure_size=6
         )
-    # show the net monetary benefit figure
-    NBA.graph_deltaNMB_lines(
-        min_wtp=0,
-        max_wtp=50000,
-        title='Cost-Benefit Analysis',
-        x_label='Willingness-to-pay for one additional QALY ($)',
-        y_label='Incremental Net Monetary Benefit ($)',
-        interval=Econ.Interval.CONFIDENCE,
-        show_legend=True,
-        figure_size=6
-    )
@@ -0,0 +1,99 @@
+import numpy as np
+
+# survival curve built from the survival times of all patients at once: deaths are counted at each distinct
+# survival time with np.unique and the curve is the Kaplan-Meier product over these times, so patients who are
+# alive at the end of the simulation can be censored. The curve has the same interface as the sample paths of
+# scr.SamplePathClasses (name, get_times and get_values), so it can be plotted with graph_sample_path(s).
+# Survival times can also be given with the number of patients who share each of them (for example the deaths
+# counted in each time bin by OnlineStatistics.SurvivalHistogram), so the curve never needs one entry per patient.
+
+
+class SurvivalCurve:
+    def __init__(self, name, itr, survival_times, censoring_times=None, counts=None):
+        """ create the survival curve of a cohort
+        :param name: name of the survival curve
+        :param itr: id of the curve (as the iteration of a sample path)
+        :param survival_times: survival time of each patient (nan or None for patients who are alive at the
+                               end of simulation)
+        :param censoring_times: time at which patients who are alive are censored (a number for all of them,
+                                for example the simulation length, or an array with one entry per patient);
+                                if not provided, patients who are alive stay at risk over the whole curve
+        :param counts: number of patients with each of the survival times (one patient each if not provided)
+        """
+        self.name = name
+        self.itr = itr
+
+        survival_times = np.array(survival_times, dtype=float)
+        if_died = ~np.isnan(survival_times)
+        if counts is None:
+            counts = np.ones(len(survival_times), dtype=np.int64)
+        else:
+            counts = np.asarray(counts, dtype=np.int64)
+        self._initialSize = int(counts.sum())
+
+        # number of deaths at each distinct survival time
+        self._deathTimes, inverse = np.unique(survival_times[if_died], return_inverse=True)
+        self._deathCounts = np.bincount(inverse, weights=counts[if_died], minlength=len(self._deathTimes))\
+            .astype(np.int64)
+
+        # number of patients at risk just before each death time: patients who have not died or been censored
+        # earlier (patients censored at a death time are still at risk at that time)
+        deaths_before = np.concatenate(([0], np.cumsum(self._deathCounts)[:-1]))
+        at_risk = self._initialSize - deaths_before
+        self._censoringTimes = np.zeros(0)
+        if censoring_times is not None:
+            censoring_times = np.broadcast_to(np.asarray(censoring_times, dtype=float), survival_times.shape)
+            self._censoringTimes = np.sort(np.repeat(censoring_times[~if_died], counts[~if_died]))
+            at_risk = at_risk - np.searchsorted(self._censoringTimes, self._deathTimes, side='left')
+        self._atRisk = at_risk
+
+        # Kaplan-Meier estimate of the probability of surviving beyond each death time
+        self._survivalProbs = np.cumprod(1 - self._deathCounts / at_risk)
+
+    def get_initial_size(self):
+        return self._initialSize
+
+    def get_death_times(self):
+        """ :returns distinct survival times of patients who have died """
+        return self._deathTimes
+
+    def get_death_counts(self):
+        """ :returns number of patients who die at each distinct survival time """
+        return self._deathCounts
+
+    def get_n_at_risk(self):
+        """ :returns number of patients at risk just before each distinct survival time """
+        return self._atRisk
+
+    def get_bin_counts(self, bin_width):
+        """ :returns (left edges of bins, number of deaths in each bin) of a histogram of survival times
+        :param bin_width: width of bins
+        """
+        if len(self._deathTimes) == 0:
+            return np.zeros(0), np.zeros(0, dtype=np.int64)
+        bins = np.floor(self._deathTimes / bin_width).astype(int)
+        counts = np.bincount(bins, weights=self._deathCounts).astype(np.int64)
+        return np.arange(len(counts)) * bin_width, counts
+
+    def get_times(self):
+        """ :returns times at which the curve changes (time 0, each death time and, if patients are censored,
+        the last censoring time) """
+        times = np.concatenate(([0], self._deathTimes))
+        if len(self._censoringTimes) > 0 and self._censoringTimes[-1] > times[-1]:
+            times = np.append(times, self._censoringTimes[-1])
+        return times
+
+    def get_survival_probabilities(self):
+        """ :returns probability of surviving beyond each of the times of get_times """
+        probs = np.concatenate(([1], self._survivalProbs))
+        if len(probs) < len(self.get_times()):
+            probs = np.append(probs, probs[-1])
+        return probs
+
+    def get_values(self):
+        """ :returns size of the population alive at each of the times of get_times (the number of patients
+        alive when no patient is censored before the last death) """
+        if len(self._censoringTimes) == 0:
+            # exact counts
+            return self._initialSize - np.concatenate(([0], np.cumsum(self._deathCounts)))
+        return self._initialSize * self.get_survival_probabilities()
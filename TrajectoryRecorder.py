@@ -0,0 +1,154 @@
+import numpy as np
+import ParameterClasses as P
+import InputData as Data
+
+# trajectory recorder keeps the path of every simulated patient as run-length-encoded (state, number of time
+# points) pairs in flat NumPy arrays shared by all patients: the state of a patient at time steps 0, 1, 2, ...
+# is stored as runs of equal states, so a patient who stays well for 30 cycles takes a single run. The path of
+# patient i is the runs first_run[i], ..., first_run[i+1]-1. Occupancy curves, times to first stroke and
+# transition counts are computed from the runs without expanding the paths.
+
+
+class TrajectoryRecorder:
+    def __init__(self, delta_t=None, initial_capacity=1024):
+        """ create an empty recorder (patients are recorded one after the other by PatientStateMonitor)
+        :param delta_t: length of time step of the recorded patients (Data.DELTA_T if not provided)
+        :param initial_capacity: number of runs and patients to allocate before the arrays have to grow
+        """
+        self._delta_t = Data.DELTA_T if delta_t is None else delta_t
+
+        # state and number of time points of each run
+        self._runStates = np.zeros(initial_capacity, dtype=np.int8)
+        self._runLengths = np.zeros(initial_capacity, dtype=np.int32)
+        self._nRuns = 0
+        # id and index of the first run of each patient
+        self._patientIds = np.zeros(initial_capacity, dtype=np.int64)
+        self._firstRuns = np.zeros(initial_capacity, dtype=np.int64)
+        self._nPatients = 0
+        # state of the last run (kept as an int to avoid reading the array at every time step)
+        self._lastState = None
+
+    def start_patient(self, patient_id, initial_state):
+        """ starts the path of a new patient
+        :param patient_id: id of the patient
+        :param initial_state: health state of the patient at time step 0
+        """
+        if self._nPatients == len(self._patientIds):
+            self._patientIds = _grow(self._patientIds)
+            self._firstRuns = _grow(self._firstRuns)
+        self._patientIds[self._nPatients] = patient_id
+        self._firstRuns[self._nPatients] = self._nRuns
+        self._nPatients += 1
+
+        self._lastState = None
+        self.record(initial_state)
+
+    def record(self, state):
+        """ records the state of the current patient at the next time step (tunnel states are recorded as
+        their health state) """
+        value = P.get_health_state(state).value
+        if value == self._lastState:
+            self._runLengths[self._nRuns - 1] += 1
+            return
+
+        if self._nRuns == len(self._runStates):
+            self._runStates = _grow(self._runStates)
+            self._runLengths = _grow(self._runLengths)
+        self._runStates[self._nRuns] = value
+        self._runLengths[self._nRuns] = 1
+        self._nRuns += 1
+        self._lastState = value
+
+    def get_n_patients(self):
+        return self._nPatients
+
+    def get_n_runs(self):
+        return self._nRuns
+
+    def get_nbytes(self):
+        """ :returns the number of bytes used by the recorded runs and patients """
+        return self._nRuns * (self._runStates.itemsize + self._runLengths.itemsize) \
+            + self._nPatients * (self._patientIds.itemsize + self._firstRuns.itemsize)
+
+    def get_patient_ids(self):
+        return self._patientIds[:self._nPatients]
+
+    def get_runs(self):
+        """ :returns (state of each run, number of time points of each run, index of the first run of each patient)
+        as NumPy arrays (the runs of patient i are first_runs[i], ..., first_runs[i+1]-1) """
+        return self._runStates[:self._nRuns], self._runLengths[:self._nRuns], self._firstRuns[:self._nPatients]
+
+    def get_trajectory(self, i):
+        """ :returns list of (health state, number of time steps) of the path of the i-th recorded patient """
+        states, lengths, first_runs = self.get_runs()
+        last = first_runs[i + 1] if i + 1 < self._nPatients else self._nRuns
+        return [(P.HealthStats(int(s)), int(n)) for s, n in zip(states[first_runs[i]:last], lengths[first_runs[i]:last])]
+
+    def _get_run_patients_and_starts(self):
+        """ :returns (patient index of each run, time step at which each run starts) """
+        states, lengths, first_runs = self.get_runs()
+        runs_per_patient = np.diff(np.append(first_runs, self._nRuns))
+        run_patients = np.repeat(np.arange(self._nPatients), runs_per_patient)
+        # time steps are counted from the first run of each patient
+        ends = np.cumsum(lengths, dtype=np.int64)
+        starts = ends - lengths
+        starts -= np.repeat(starts[first_runs], runs_per_patient)
+        return run_patients, starts
+
+    def get_occupancy(self, n_time_steps=None):
+        """ :returns the number of patients in each health state at time steps 0, 1, ..., n_time_steps-1 as a
+        NumPy array (time steps x states); deceased patients stay in the death state
+        :param n_time_steps: number of time steps (by default up to the longest recorded path)
+        """
+        states, lengths, first_runs = self.get_runs()
+        run_patients, starts = self._get_run_patients_and_starts()
+        ends = starts + lengths
+        if n_time_steps is None:
+            n_time_steps = int(ends.max(initial=0))
+
+        # the death state is absorbing
+        ends = np.where(states == P.HealthStats.DEATH.value, n_time_steps, np.minimum(ends, n_time_steps))
+        starts = np.minimum(starts, n_time_steps)
+
+        # +1 when a run starts and -1 when it ends, accumulated over time
+        n_states = len(P.HealthStats)
+        changes = np.bincount(starts * n_states + states, minlength=(n_time_steps + 1) * n_states) \
+            - np.bincount(ends * n_states + states, minlength=(n_time_steps + 1) * n_states)
+        return np.cumsum(changes.reshape(n_time_steps + 1, n_states), axis=0)[:n_time_steps]
+
+    def get_times_to_first_stroke(self):
+        """ :returns time of the first stroke of each recorded patient (nan for patients without a stroke);
+        the transition into the stroke state is placed in the middle of its time step, as survival times """
+        states, lengths, first_runs = self.get_runs()
+        run_patients, starts = self._get_run_patients_and_starts()
+
+        times = np.full(self._nPatients, np.nan)
+        stroke_runs = np.flatnonzero(states == P.HealthStats.STROKE.value)
+        # the first stroke run of each patient
+        patients, first = np.unique(run_patients[stroke_runs], return_index=True)
+        times[patients] = (starts[stroke_runs[first]] - 0.5) * self._delta_t
+        return times
+
+    def get_transition_counts(self):
+        """ :returns the number of transitions from each health state (rows) to each health state (columns)
+        over all recorded time steps as a NumPy array (states x states) """
+        states, lengths, first_runs = self.get_runs()
+        n_states = len(P.HealthStats)
+        counts = np.zeros((n_states, n_states), dtype=np.int64)
+
+        # a run of n time points contains n-1 transitions to the same state
+        np.add.at(counts, (states, states), lengths.astype(np.int64) - 1)
+        # consecutive runs of the same patient are transitions between different states
+        if_next_same_patient = np.ones(self._nRuns, dtype=bool)
+        if_next_same_patient[first_runs[1:] - 1] = False
+        if_next_same_patient[-1:] = False
+        from_runs = np.flatnonzero(if_next_same_patient)
+        np.add.at(counts, (states[from_runs], states[from_runs + 1]), 1)
+        return counts
+
+
+def _grow(array):
+    """ :returns a copy of the array with twice its length (the new entries are zero) """
+    grown = np.zeros(max(2 * len(array), 1), dtype=array.dtype)
+    grown[:len(array)] = array
+    return grown
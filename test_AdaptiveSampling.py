@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+import AdaptiveSampling as Adaptive
+import MarkovModelCompiled as CompiledCls
+import MarkovModelVectorized as VecCls
+import ParameterClasses as P
+
+
+@pytest.mark.parametrize('cohort_class', [CompiledCls.Cohort, VecCls.Cohort])
+def test_truncated_last_batch_has_its_own_patients(cohort_class):
+    # the patient budget is not a multiple of the batch size, so the last batch is cut to 500 patients
+    cohort = Adaptive.AdaptiveCohort(0, P.Therapies.NONE, tolerances={}, batch_size=1000, max_pop_size=2500,
+                                     min_pop_size=2500, cohort_class=cohort_class)
+    cohort.simulate()
+    assert cohort.get_initial_pop_size() == 2500
+
+    survival_times, count_strokes, costs, utilities = cohort.get_outcomes()
+    assert len(costs) == 2500
+    # patients of the last batch are not copies of the patients of an earlier batch
+    assert not np.array_equal(costs[2000:2500], costs[1000:1500])
+    assert not np.array_equal(costs[2000:2500], costs[0:500])
+    # they are the first patients of the full third batch
+    batch = cohort_class(id=cohort.get_batch_ids()[2], therapy=P.Therapies.NONE, pop_size=1000)
+    assert np.array_equal(costs[2000:2500], batch.simulate_outcomes()[2][:500])
+
+
+def test_check_paired_requires_the_same_pop_size():
+    tolerances = {Adaptive.COST: np.inf}
+    cohort_1 = Adaptive.AdaptiveCohort(0, P.Therapies.NONE, tolerances, batch_size=100, max_pop_size=1000,
+                                       min_pop_size=200)
+    cohort_2 = Adaptive.AdaptiveCohort(0, P.Therapies.ANTICOAG, tolerances, batch_size=100, max_pop_size=1000,
+                                       min_pop_size=500)
+    cohort_1.simulate()
+    cohort_2.simulate()
+    with pytest.raises(ValueError):
+        Adaptive.check_paired(cohort_1, cohort_2)
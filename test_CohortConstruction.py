@@ -0,0 +1,50 @@
+import time
+import tracemalloc
+import MarkovModel as MarkovCls
+import ParameterClasses as P
+
+# construction time and memory per patient of a cohort whose patients share one parameter object, compared with
+# patients that each get their own parameter object (as Cohort.__init__ used to do); the bounds are orders of
+# magnitude, so the test only fails if patients stop sharing their parameters or grow far beyond their slots
+
+THERAPY = P.Therapies.ANTICOAG
+POP_SIZE = 1000
+
+
+def measure(build):
+    """ :returns (time in seconds, memory held by the built object in bytes) of build() """
+
+    # time (without tracing allocations)
+    start = time.perf_counter()
+    build()
+    elapsed = time.perf_counter() - start
+
+    # memory held by the built object
+    tracemalloc.start()
+    obj = build()
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    return elapsed, memory
+
+
+def build_patients_with_own_parameters():
+    return [MarkovCls.Patient(i, P.ParametersFixed(THERAPY)) for i in range(POP_SIZE)]
+
+
+def simulate_cohort():
+    cohort = MarkovCls.Cohort(id=0, therapy=THERAPY, pop_size=POP_SIZE)
+    cohort.simulate()
+    return cohort
+
+
+def test_cohort_construction_time_and_memory():
+    time_own, memory_own = measure(build_patients_with_own_parameters)
+    time_cohort, memory_cohort = measure(simulate_cohort)
+
+    # the simulated cohort (patients, their state monitors and outcomes) takes well under 2 kB per patient
+    assert memory_cohort / POP_SIZE < 2000
+    # patients with their own parameter objects take an order of magnitude more memory
+    assert memory_own > 5 * memory_cohort
+    # creating and simulating 1000 patients takes seconds, not minutes
+    assert time_cohort < 10
@@ -0,0 +1,32 @@
+import numpy as np
+import MarkovModel as MarkovCls
+import ParameterClasses as P
+import RandomStreams as Streams
+
+
+def get_outcomes(outputs):
+    return outputs.get_survival_times_by_patient(), outputs.get_if_developed_stroke(), \
+        outputs.get_costs(), outputs.get_utilities()
+
+
+def assert_same_outcomes(outcomes_1, outcomes_2):
+    for x, y in zip(outcomes_1, outcomes_2):
+        assert np.array_equal(x, y, equal_nan=True)
+
+
+def test_parallel_simulation_matches_serial():
+    for streams in [None, Streams.RandomStreams(5)]:
+        serial = MarkovCls.Cohort(1, P.Therapies.ANTICOAG, pop_size=200, streams=streams).simulate()
+        parallel = MarkovCls.Cohort(1, P.Therapies.ANTICOAG, pop_size=200, streams=streams).simulate(
+            n_workers=2, chunk_size=30)
+        assert_same_outcomes(get_outcomes(serial), get_outcomes(parallel))
+
+
+def test_parallel_streaming_matches_serial():
+    serial = MarkovCls.Cohort(2, P.Therapies.NONE, streaming=True, pop_size=200).simulate()
+    parallel = MarkovCls.Cohort(2, P.Therapies.NONE, streaming=True, pop_size=200).simulate(n_workers=2,
+                                                                                          chunk_size=30)
+    for getter in ['get_sumStat_survival_times', 'get_sumStat_count_strokes', 'get_sumStat_discounted_cost',
+                   'get_sumStat_discounted_utility']:
+        assert getattr(serial, getter)().get_mean() == getattr(parallel, getter)().get_mean()
+
@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+import MarkovModel as MarkovCls
+import ParameterClasses as P
+import RandomStreams as Streams
+
+# the compiled kernel is only tested when Numba is installed (otherwise the engine runs MarkovModel.Patient)
+pytest.importorskip('numba')
+import MarkovModelCompiled as CompiledCls
+
+
+def get_object_outcomes(cohort_id, therapy, pop_size, streams=None):
+    """ :returns the outcomes of MarkovModel.Cohort as arrays (nan for patients who are alive) """
+    outputs = MarkovCls.Cohort(cohort_id, therapy, pop_size=pop_size, streams=streams).simulate()
+    return outputs.get_survival_times_by_patient(), outputs.get_if_developed_stroke(), \
+        outputs.get_costs(), outputs.get_utilities()
+
+
+@pytest.mark.parametrize('therapy', list(P.Therapies))
+@pytest.mark.parametrize('if_streams', [False, True])
+def test_compiled_matches_object_engine(therapy, if_streams):
+    streams = Streams.RandomStreams(11) if if_streams else None
+    expected = get_object_outcomes(3, therapy, 300, streams)
+    outcomes = CompiledCls.Cohort(id=3, therapy=therapy, pop_size=300, streams=streams).simulate_outcomes()
+    for x, y in zip(outcomes, expected):
+        assert np.array_equal(x, y, equal_nan=True)
+
+
+def test_seeds_must_be_below_2_to_the_32():
+    cohort = CompiledCls.Cohort(id=2**32 // 10, therapy=P.Therapies.NONE, pop_size=10)
+    with pytest.raises(ValueError):
+        cohort.simulate_outcomes()
@@ -0,0 +1,52 @@
+import numpy as np
+import MarkovModel as MarkovCls
+import MarkovModelEventDriven as EventCls
+import MarkovModelVectorized as VecCls
+import ParameterClasses as P
+import RandomStreams as Streams
+
+# patient i of a cohort draws the random numbers of its own stream, so its outcomes are the same in every
+# time-step engine and do not depend on the other patients of the cohort
+
+
+def test_object_and_vectorized_engines_agree():
+    streams = Streams.RandomStreams(3)
+    for therapy in P.Therapies:
+        outputs = MarkovCls.Cohort(7, therapy, pop_size=300, streams=streams).simulate()
+        expected = (outputs.get_survival_times_by_patient(), outputs.get_if_developed_stroke(),
+                    outputs.get_costs(), outputs.get_utilities())
+        outcomes = VecCls.Cohort(id=7, therapy=therapy, pop_size=300, streams=streams).simulate_outcomes()
+        for x, y in zip(outcomes, expected):
+            assert np.array_equal(x, y, equal_nan=True)
+
+
+def test_event_driven_patients_do_not_depend_on_the_cohort():
+    # the event-driven engine draws one uniform per sojourn and transition instead of one per time step, so
+    # its patients match those of the time-step engines in distribution only; each patient still depends on
+    # its own stream alone
+    streams = Streams.RandomStreams(3)
+    small = EventCls.Cohort(7, P.Therapies.NONE, pop_size=100, streams=streams).simulate_outcomes()
+    large = EventCls.Cohort(7, P.Therapies.NONE, pop_size=2000, streams=streams).simulate_outcomes()
+    for x, y in zip(small, large):
+        assert np.array_equal(x, y[:100], equal_nan=True)
+
+
+def test_event_driven_and_vectorized_engines_agree_in_distribution():
+    streams = Streams.RandomStreams(3)
+    pop_size = 20000
+    event = EventCls.Cohort(7, P.Therapies.NONE, pop_size=pop_size, streams=streams).simulate_outcomes()
+    vectorized = VecCls.Cohort(id=7, therapy=P.Therapies.NONE, pop_size=pop_size, streams=streams)\
+        .simulate_outcomes()
+    for x, y in zip(event[1:], vectorized[1:]):
+        # difference of the means within 4 standard errors
+        st_err = np.sqrt((np.var(x) + np.var(y)) / pop_size)
+        assert abs(np.mean(x) - np.mean(y)) < 4 * st_err
+
+
+def test_replay_patient_reproduces_recorded_outcome():
+    streams = Streams.RandomStreams(9)
+    cohort = MarkovCls.Cohort(4, P.Therapies.NONE, pop_size=50, streams=streams)
+    cohort.simulate()
+    for i in [0, 17, 49]:
+        patient = MarkovCls.replay_patient(P.Therapies.NONE, 4, i, streams)
+        assert MarkovCls.get_patient_outcome(patient) == MarkovCls.get_patient_outcome(cohort.get_patients()[i])
@@ -0,0 +1,54 @@
+import ParameterClasses as P
+import MarkovModelDeterministic as DetCls
+import MarkovModelVectorized as VecCls
+import MarkovModelEventDriven as EventCls
+
+# the expected outcomes of the cohort trace should converge as the time step DELTA_T shrinks (the stroke state
+# lasts TRANS_MATRIX_TIME_STEP whatever the time step), with the half-cycle correction as the remaining error
+
+TIME_STEPS = [1, 1/2, 1/4, 1/12, 1/52]
+
+
+def get_outcomes(therapy, delta_t):
+    """ :returns (mean survival time, mean number of strokes, mean discounted cost, mean discounted utility) of
+    the cohort trace with the time step delta_t """
+    outputs = DetCls.CohortTrace(therapy, P.ParametersFixed(therapy, {'DELTA_T': delta_t})).simulate()
+    return [outputs.get_mean_survival_time(), outputs.get_mean_count_strokes(),
+            outputs.get_mean_discounted_cost(), outputs.get_mean_discounted_utility()]
+
+
+def test_outcomes_converge_as_time_step_shrinks():
+    for therapy in P.Therapies:
+        outcomes = [get_outcomes(therapy, delta_t) for delta_t in TIME_STEPS]
+        finest = outcomes[-1]
+        for i in range(len(finest)):
+            errors = [abs(o[i] - finest[i]) / abs(finest[i]) for o in outcomes[:-1]]
+            # the error shrinks with the time step
+            assert all(e1 >= e2 for e1, e2 in zip(errors[:-1], errors[1:])), (therapy, i, errors)
+            # monthly and weekly time steps agree within 1%
+            assert errors[-1] < 0.01, (therapy, i, errors)
+
+
+def test_stroke_lasts_trans_matrix_time_step():
+    for delta_t in TIME_STEPS:
+        param = P.ParametersFixed(P.Therapies.NONE, {'DELTA_T': delta_t})
+        states = param.get_model_states()
+        n_steps = P.get_n_tunnel_steps(delta_t, param.get_inputs().TRANS_MATRIX_TIME_STEP)
+        assert len(states) == len(P.HealthStats) + n_steps - 1
+        # patients who enter the stroke state stay in it (and its tunnel states) for n_steps time steps
+        stroke_states = [s for s in states if P.get_health_state(s) == P.HealthStats.STROKE]
+        assert len(stroke_states) == n_steps
+        for current_state, next_state in zip(stroke_states[:-1], stroke_states[1:]):
+            assert param.get_transition_prob(current_state, 0)[next_state.value] == 1
+
+
+def test_simulation_engines_with_more_than_127_states():
+    # a time step of 1/200 year expands the stroke state into 200 states (state indices must not wrap around)
+    param = P.ParametersFixed(P.Therapies.NONE, {'DELTA_T': 1/200})
+    assert len(param.get_model_states()) > 127
+    expected = DetCls.CohortTrace(P.Therapies.NONE, param).simulate(10).get_mean_discounted_cost()
+    for cohort_class in [VecCls.Cohort, EventCls.Cohort]:
+        cohort = cohort_class(id=0, therapy=P.Therapies.NONE, pop_size=4000, parameters=param)
+        costs = cohort.simulate_outcomes(10)[2]
+        # within 4 standard errors of the expected cost
+        assert abs(costs.mean() - expected) < 4 * costs.std() / len(costs) ** 0.5